@@ -1,19 +1,370 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.middleware.proxy_fix import ProxyFix
+import asyncio
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
 import re
 import time
 import json
 import os
+import sqlite3
+import hashlib
+import gzip
+import csv
+import codecs
+import math
+import uuid
 import tempfile
 import random
 from urllib.parse import quote, urljoin
 from bs4 import BeautifulSoup
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+from collections import deque, OrderedDict
+from array import array
+from contextlib import contextmanager, asynccontextmanager
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import aiohttp
+from asgiref.wsgi import WsgiToAsgi
+from serving import container_cpus, web_workers
+
+# Optional speedups: orjson for serialization, brotli for br compression
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
+# Behind Render's proxy remote_addr is the proxy, take the client from X-Forwarded-For
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+# Validator fields dropped from validated_emails in compact mode
+COMPACT_OMIT_FIELDS = ('raw_response', 'validation_details')
+
+def dumps_json(payload, default=None):
+    """Serialize a payload to UTF-8 JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return dumps_json(obj, default=self.default).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if orjson is not None:
+    app.json = FastJSONProvider(app)
+
+def negotiate_encoding(accept_encoding):
+    """Pick the br/gzip encoding with the highest q-value, None for identity.
+    
+    Preference order (br, then gzip) only breaks ties between equal q-values.
+    """
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        token, *params = part.split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        token = token.strip()
+        if token:
+            accepted[token.strip().lower()] = quality
+    
+    best, best_quality = None, 0.0
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress_body(body, encoding):
+    """Compress a response body with the negotiated encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=5)
+
+@app.after_request
+def compress_response(response):
+    """Compress large JSON responses according to Accept-Encoding"""
+    if (response.direct_passthrough or
+            response.is_streamed or
+            response.mimetype != 'application/json' or
+            'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        response.set_data(compress_body(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+class Deadline:
+    """Overall time budget for one request, passed down to every stage and outbound call.
+    
+    `seconds=None` means unbounded, in which case `timeout(cap)` returns the cap
+    and the pipeline behaves exactly as before. A budget of zero or less is
+    already expired.
+    """
+    
+    def __init__(self, seconds=None):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+    
+    @classmethod
+    def until(cls, wall_clock_expiry):
+        """Rebuild a deadline from wall_clock_expiry(), e.g. in another process"""
+        if wall_clock_expiry is None:
+            return cls()
+        return cls(wall_clock_expiry - time.time())
+    
+    def wall_clock_expiry(self):
+        """Absolute expiry as a time.time() timestamp, or None when unbounded"""
+        remaining = self.remaining()
+        return time.time() + remaining if remaining is not None else None
+    
+    def remaining(self):
+        """Seconds left, or None when unbounded"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self):
+        """True once the budget has run out"""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+    
+    def timeout(self, cap):
+        """Timeout for one call: the usual cap, shortened to the remaining budget"""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return max(0.1, min(cap, remaining))
+
+class DeliverabilityEngine:
+    """Local, SMTP-free deliverability checks for candidate emails grouped by domain.
+    
+    Each domain gets one MX (falling back to A) lookup, cached for a few minutes,
+    and format, disposable and role-account checks run against indexed sets.
+    Only candidates the local checks cannot decide are left for external APIs.
+    
+    `resolver` is anything with a dnspython-style `resolve(qname, rdtype, lifetime=...)`
+    that raises on missing records and returns MX answers with an `.exchange`
+    attribute, so a local stub can stand in for DNS.
+    """
+    
+    EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+    
+    DISPOSABLE_DOMAINS = frozenset([
+        '10minutemail.com', 'tempmail.org', 'guerrillamail.com', 'mailinator.com',
+        'yopmail.com', '33mail.com', 'temp-mail.org', 'trashmail.com',
+        'sharklasers.com', 'getnada.com', 'dispostable.com', 'maildrop.cc',
+        'throwawaymail.com', 'fakeinbox.com', 'mintemail.com', 'spamgourmet.com'
+    ])
+    
+    ROLE_ACCOUNTS = frozenset([
+        'admin', 'support', 'help', 'info', 'contact', 'sales', 'marketing', 'hr',
+        'careers', 'noreply', 'no-reply', 'hello', 'service', 'office', 'mail',
+        'team', 'general', 'export', 'international', 'trading', 'procurement',
+        'quality', 'regulatory', 'logistics', 'operations', 'purchasing',
+        'sourcing', 'ceo', 'president', 'director', 'manager', 'head', 'chief',
+        'finance', 'accounting', 'pr', 'media', 'legal', 'compliance', 'it',
+        'tech', 'engineering', 'recruiting', 'talent', 'jobs', 'billing',
+        'webmaster', 'postmaster', 'abuse', 'press', 'enquiries', 'inquiries'
+    ])
+    
+    def __init__(self, resolver=None, cache_ttl=300, cache_size=10000):
+        self.resolver = resolver
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._domain_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def get_resolver(self):
+        """Return the configured resolver, defaulting to dnspython"""
+        if self.resolver is None:
+            import dns.resolver
+            self.resolver = dns.resolver
+        return self.resolver
+    
+    def lookup_domain(self, domain, deadline=None):
+        """One MX lookup (A fallback) per domain, cached for cache_ttl seconds.
+        
+        The cache keeps the cache_size most recently used domains, so long
+        bulk runs do not grow it without bound.
+        
+        Queries are bounded by the deadline; a lookup skipped or cut short by
+        it is returned as incomplete and not cached.
+        """
+        deadline = deadline or Deadline()
+        now = time.time()
+        with self._cache_lock:
+            cached = self._domain_cache.get(domain)
+            if cached and cached[0] > now:
+                self._domain_cache.move_to_end(domain)
+                return cached[1]
+        
+        info = {"has_mx": False, "has_a": False, "null_mx": False, "mx_hosts": [], "incomplete": False}
+        if deadline.expired():
+            info.update({"accepts_mail": False, "incomplete": True})
+            return info
+        
+        resolver = self.get_resolver()
+        try:
+            answers = resolver.resolve(domain, 'MX', lifetime=deadline.timeout(5))
+            hosts = [str(answer.exchange).rstrip('.') for answer in answers]
+            info["mx_hosts"] = sorted(host for host in hosts if host)
+            info["has_mx"] = bool(info["mx_hosts"])
+            # RFC 7505 null MX: the domain explicitly accepts no mail
+            info["null_mx"] = bool(hosts) and not info["has_mx"]
+        except Exception:
+            pass
+        
+        if not info["has_mx"] and not info["null_mx"]:
+            try:
+                info["has_a"] = len(resolver.resolve(domain, 'A', lifetime=deadline.timeout(5))) > 0
+            except Exception:
+                pass
+        
+        info["accepts_mail"] = info["has_mx"] or info["has_a"]
+        if not info["accepts_mail"] and not info["null_mx"] and deadline.expired():
+            # No answer within the budget is not proof the domain has no mail servers
+            info["incomplete"] = True
+            return info
+        
+        with self._cache_lock:
+            self._domain_cache[domain] = (now + self.cache_ttl, info)
+            self._domain_cache.move_to_end(domain)
+            while len(self._domain_cache) > self.cache_size:
+                self._domain_cache.popitem(last=False)
+        return info
+    
+    def is_role_account(self, local_part):
+        """Role check against the indexed set (whole local part or its first token)"""
+        if local_part in self.ROLE_ACCOUNTS:
+            return True
+        first_token = re.split(r'[._+-]', local_part, maxsplit=1)[0]
+        return first_token in self.ROLE_ACCOUNTS
+    
+    def group_by_domain(self, emails):
+        """Group candidates by their domain, keeping first-seen order"""
+        groups = {}
+        for email in emails:
+            domain = email.split('@')[1] if '@' in email else ''
+            groups.setdefault(domain, []).append(email)
+        return groups
+    
+    def assess(self, emails, deadline=None):
+        """Run the local checks on every candidate, returning {email: result}"""
+        results = {}
+        
+        for domain, domain_emails in self.group_by_domain(emails).items():
+            is_disposable = domain in self.DISPOSABLE_DOMAINS
+            if domain and not is_disposable:
+                domain_info = self.lookup_domain(domain, deadline)
+            else:
+                domain_info = {"accepts_mail": False}
+            dns_incomplete = domain_info.get("incomplete", False)
+            
+            for email in domain_emails:
+                local_part = email.split('@')[0].lower() if '@' in email else ''
+                format_valid = self.EMAIL_REGEX.match(email) is not None
+                is_role_account = self.is_role_account(local_part)
+                valid = format_valid and domain_info["accepts_mail"] and not is_disposable
+                status = valid
+                # Role accounts are not sent to external APIs: valid on MX, deliverability unverified
+                deliverable = "unknown" if valid and is_role_account else valid
+                if dns_incomplete and format_valid:
+                    status = deliverable = "unknown"
+                
+                results[email] = {
+                    "email": email,
+                    "valid": status,
+                    "deliverable": deliverable,
+                    "disposable": is_disposable,
+                    "role_account": is_role_account,
+                    "catch_all": None,
+                    "validator": "local_deliverability",
+                    "validation_details": {
+                        "format_valid": format_valid,
+                        "domain_valid": domain_info["accepts_mail"],
+                        "mx_hosts": domain_info.get("mx_hosts", []),
+                        "dns_incomplete": dns_incomplete,
+                        "is_disposable": is_disposable,
+                        "is_role_account": is_role_account,
+                        # Only valid personal mailboxes need an external check
+                        "needs_verification": valid and not is_role_account
+                    }
+                }
+        
+        return results
+    
+    def pending_emails(self, results):
+        """Candidates the local checks could not decide"""
+        return [email for email, result in results.items()
+                if result.get("validator") == "local_deliverability"
+                and result["validation_details"]["needs_verification"]]
+    
+    def pending_domains(self, results):
+        """Domains with undecided candidates, i.e. worth a catch-all probe"""
+        domains = []
+        for email in self.pending_emails(results):
+            domain = email.split('@')[1]
+            if domain not in domains:
+                domains.append(domain)
+        return domains
+    
+    def catch_all_probe_address(self, domain):
+        """An address that should not exist on a non catch-all domain"""
+        return f"zz-probe-{random.getrandbits(48):012x}@{domain}"
+    
+    def mark_catch_all(self, results, domain, catch_all):
+        """Record the catch-all probe outcome for a domain's candidates"""
+        for email, result in results.items():
+            if not email.endswith(f"@{domain}") or result.get("validator") != "local_deliverability":
+                continue
+            result["catch_all"] = catch_all
+            if catch_all and result["validation_details"]["needs_verification"]:
+                # A catch-all domain accepts anything, external APIs cannot tell more
+                result["deliverable"] = "unknown"
+                result["validation_details"]["needs_verification"] = False
+    
+    def catch_all_from_probe(self, probe_result):
+        """Catch-all verdict from a probe result: only an explicit `deliverable` answer counts"""
+        deliverable = (probe_result.get("raw_response") or {}).get("deliverable")
+        return deliverable if isinstance(deliverable, bool) else None
+
 class ComprehensiveEmailFinder:
     def __init__(self):
         self.user_agents = [
@@ -23,6 +374,33 @@ class ComprehensiveEmailFinder:
         ]
         self.harvester_path = "/app/theHarvester/theHarvester.py"
         
+        # Network discovery stages, cheapest first: one theHarvester run, then 21 scraped pages
+        self.discovery_stages = [
+            {"method": "theHarvester", "label": "theHarvester", "icon": "🔍"},
+            {"method": "web_scraping", "label": "Web scraping", "icon": "🌐"}
+        ]
+        
+        # Pages to check during web scraping
+        self.scrape_pages = [
+            '',  # Homepage
+            '/contact', '/contact-us', '/about', '/about-us', '/team',
+            '/staff', '/people', '/management', '/leadership', '/directors',
+            '/careers', '/jobs', '/employment', '/press', '/media',
+            '/legal', '/privacy', '/terms', '/support', '/help'
+        ]
+        
+        # Pooled HTTP session for scraping and validators (one per process)
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=50, pool_maxsize=50)
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+        
+        # Local SMTP-free deliverability checks, grouped by domain
+        self.deliverability = DeliverabilityEngine()
+        
+        # Shared aiohttp session for the async pipeline (created lazily inside the event loop)
+        self._async_session = None
+        
         # Multiple email validation APIs for waterfall
         self.validation_apis = [
             {
@@ -45,50 +423,87 @@ class ComprehensiveEmailFinder:
             }
         ]
     
-    def waterfall_email_search(self, domain, sources="all", limit=100):
-        """Waterfall enrichment: theHarvester -> Web Scraping -> LinkedIn -> Patterns"""
+    def waterfall_email_search(self, domain, sources="all", limit=100, deadline=None,
+                               target_count=None, min_score=100):
+        """Waterfall enrichment: theHarvester -> Web Scraping -> LinkedIn -> Patterns
+        
+        With `target_count` the network stages stop as soon as that many discovered
+        emails score >= `min_score` on score_email_relevance; the rest are skipped.
+        """
+        deadline = deadline or Deadline()
+        plan = self.waterfall_plan(domain, deadline, target_count, min_score)
+        try:
+            stage = next(plan)
+            while True:
+                stage = plan.send(self.run_discovery_stage(stage['method'], domain, sources, limit, deadline))
+        except StopIteration as finished:
+            return finished.value
+    
+    def waterfall_plan(self, domain, deadline, target_count=None, min_score=100):
+        """Waterfall logic shared by the sync and async searches, without the network I/O.
+        
+        A generator that yields each network stage to run and expects the stage
+        result back through send(); it returns the final search result.
+        """
         all_emails = set()
+        discovered = set()
         methods_used = []
+        stages_skipped = []
         
-        # Method 1: theHarvester OSINT
-        print(f"🔍 Step 1: Running theHarvester for {domain}")
-        harvester_emails = self.run_theharvester(domain, sources, limit)
-        if harvester_emails['emails']:
-            all_emails.update(harvester_emails['emails'])
-            methods_used.append("theHarvester")
-            print(f"✅ theHarvester found {len(harvester_emails['emails'])} emails")
-        
-        # Method 2: Direct Web Scraping
-        print(f"🌐 Step 2: Web scraping {domain}")
-        scraping_emails = self.comprehensive_web_scraping(domain)
-        if scraping_emails['emails']:
-            all_emails.update(scraping_emails['emails'])
-            methods_used.append("web_scraping")
-            print(f"✅ Web scraping found {len(scraping_emails['emails'])} emails")
+        # Methods 1-2: network discovery, cheapest first
+        for step, stage in enumerate(self.discovery_stages, 1):
+            if deadline.expired() or self.target_reached(discovered, domain, target_count, min_score):
+                stages_skipped.append(stage['method'])
+                continue
+            
+            print(f"{stage['icon']} Step {step}: {stage['label']} for {domain}")
+            stage_result = yield stage
+            self.record_stage(all_emails, methods_used, stage_result, stage['label'])
+            discovered.update(stage_result['emails'])
+        
+        # Methods 3-6: LinkedIn, directories, dorking and smart patterns
+        self.run_offline_stages(domain, all_emails, methods_used)
+        
+        return self.build_search_result(
+            domain, all_emails, methods_used, deadline, stages_skipped,
+            self.target_reached(discovered, domain, target_count, min_score)
+        )
+    
+    def run_discovery_stage(self, method, domain, sources, limit, deadline):
+        """Run one network discovery stage by method name"""
+        if method == "theHarvester":
+            return self.run_theharvester(domain, sources, limit, deadline)
+        return self.comprehensive_web_scraping(domain, deadline)
+    
+    def target_reached(self, discovered, domain, target_count, min_score):
+        """True once enough discovered emails score >= min_score"""
+        if not target_count or not discovered:
+            return False
         
+        cleaned = self.clean_and_deduplicate_emails(list(discovered), domain)
+        qualifying = [email for email in cleaned if self.score_email_relevance(email, domain) >= min_score]
+        return len(qualifying) >= target_count
+    
+    def record_stage(self, all_emails, methods_used, stage_result, label):
+        """Merge a stage's emails into the running waterfall totals"""
+        if stage_result['emails']:
+            all_emails.update(stage_result['emails'])
+            methods_used.append(stage_result['method'])
+            print(f"✅ {label} found {len(stage_result['emails'])} emails")
+    
+    def run_offline_stages(self, domain, all_emails, methods_used):
+        """Run the stages that need no network access (steps 3-6)"""
         # Method 3: LinkedIn Company Search
         print(f"💼 Step 3: LinkedIn search for {domain}")
-        linkedin_emails = self.linkedin_company_search(domain)
-        if linkedin_emails['emails']:
-            all_emails.update(linkedin_emails['emails'])
-            methods_used.append("linkedin_search")
-            print(f"✅ LinkedIn search found {len(linkedin_emails['emails'])} emails")
+        self.record_stage(all_emails, methods_used, self.linkedin_company_search(domain), "LinkedIn search")
         
         # Method 4: Industry Directory Search
         print(f"📂 Step 4: Industry directory search for {domain}")
-        directory_emails = self.industry_directory_search(domain)
-        if directory_emails['emails']:
-            all_emails.update(directory_emails['emails'])
-            methods_used.append("directory_search")
-            print(f"✅ Directory search found {len(directory_emails['emails'])} emails")
+        self.record_stage(all_emails, methods_used, self.industry_directory_search(domain), "Directory search")
         
         # Method 5: Google Dorking
         print(f"🔎 Step 5: Google dorking for {domain}")
-        dorking_emails = self.google_dorking_search(domain)
-        if dorking_emails['emails']:
-            all_emails.update(dorking_emails['emails'])
-            methods_used.append("google_dorking")
-            print(f"✅ Google dorking found {len(dorking_emails['emails'])} emails")
+        self.record_stage(all_emails, methods_used, self.google_dorking_search(domain), "Google dorking")
         
         # Method 6: Smart Pattern Generation (always include)
         print(f"🧠 Step 6: Generating smart patterns for {domain}")
@@ -96,8 +511,10 @@ class ComprehensiveEmailFinder:
         all_emails.update(pattern_emails['emails'])
         methods_used.append("smart_patterns")
         print(f"✅ Generated {len(pattern_emails['emails'])} pattern emails")
-        
-        # Clean and deduplicate
+    
+    def build_search_result(self, domain, all_emails, methods_used, deadline=None,
+                            stages_skipped=None, target_reached=False):
+        """Clean the collected emails and build the waterfall result"""
         final_emails = self.clean_and_deduplicate_emails(list(all_emails), domain)
         
         return {
@@ -106,27 +523,35 @@ class ComprehensiveEmailFinder:
             "domain": domain,
             "methods_used": methods_used,
             "status": "success" if final_emails else "no_results",
-            "waterfall_steps": len(methods_used)
+            "waterfall_steps": len(methods_used),
+            "budget_exhausted": bool(deadline and deadline.expired()),
+            "stages_skipped": stages_skipped or [],
+            "target_reached": target_reached
         }
     
-    def run_theharvester(self, domain, sources, limit):
+    def run_theharvester(self, domain, sources, limit, deadline=None):
         """Run theHarvester with timeout and error handling"""
+        deadline = deadline or Deadline()
+        cmd = self.build_harvester_command(domain, sources, limit)
+        
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=deadline.timeout(60), cwd="/app/theHarvester")
+            emails = self.parse_harvester_output(result.stdout + result.stderr, domain)
+            return {"emails": emails, "method": "theHarvester"}
+        except:
+            return {"emails": [], "method": "theHarvester", "error": "failed"}
+    
+    def build_harvester_command(self, domain, sources, limit):
+        """Build the theHarvester command line"""
         if sources == "all":
             sources = "google,bing,yahoo,linkedin,pgp,duckduckgo"
         
-        cmd = [
+        return [
             "python3", self.harvester_path,
             "-d", domain,
             "-l", str(min(limit, 50)),
             "-b", sources
         ]
-        
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60, cwd="/app/theHarvester")
-            emails = self.parse_harvester_output(result.stdout + result.stderr, domain)
-            return {"emails": emails, "method": "theHarvester"}
-        except:
-            return {"emails": [], "method": "theHarvester", "error": "failed"}
     
     def parse_harvester_output(self, output, domain):
         """Parse theHarvester output with better filtering"""
@@ -157,57 +582,28 @@ class ComprehensiveEmailFinder:
         
         return filtered
     
-    def comprehensive_web_scraping(self, domain):
+    def comprehensive_web_scraping(self, domain, deadline=None):
         """Comprehensive web scraping with multiple pages"""
+        deadline = deadline or Deadline()
         emails = set()
         
-        # Pages to check
-        pages_to_check = [
-            '',  # Homepage
-            '/contact', '/contact-us', '/about', '/about-us', '/team',
-            '/staff', '/people', '/management', '/leadership', '/directors',
-            '/careers', '/jobs', '/employment', '/press', '/media',
-            '/legal', '/privacy', '/terms', '/support', '/help'
-        ]
-        
         def scrape_page(page_path):
             page_emails = set()
             for protocol in ['https', 'http']:
+                if deadline.expired():
+                    break
                 try:
                     url = f"{protocol}://{domain}{page_path}"
-                    response = requests.get(
+                    response = self.http.get(
                         url,
-                        timeout=10,
+                        timeout=deadline.timeout(10),
                         headers={'User-Agent': random.choice(self.user_agents)},
                         verify=False,
                         allow_redirects=True
                     )
                     
                     if response.status_code == 200:
-                        # Parse with BeautifulSoup for better extraction
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Remove script and style elements
-                        for script in soup(["script", "style"]):
-                            script.decompose()
-                        
-                        text = soup.get_text()
-                        
-                        # Extract emails
-                        found_emails = re.findall(
-                            r'\b([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})\b',
-                            text,
-                            re.IGNORECASE
-                        )
-                        page_emails.update([email.lower() for email in found_emails])
-                        
-                        # Also check mailto links
-                        mailto_links = soup.find_all('a', href=re.compile(r'^mailto:'))
-                        for link in mailto_links:
-                            email = link['href'].replace('mailto:', '').split('?')[0]
-                            if '@' in email:
-                                page_emails.add(email.lower())
-                        
+                        page_emails.update(self.extract_emails_from_html(response.content))
                         break  # Success, no need to try HTTP
                         
                 except:
@@ -216,18 +612,54 @@ class ComprehensiveEmailFinder:
             return page_emails
         
         # Use threading for faster scraping
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_page = {executor.submit(scrape_page, page): page for page in pages_to_check}
-            
-            for future in as_completed(future_to_page):
+        executor = ThreadPoolExecutor(max_workers=5)
+        future_to_page = {executor.submit(scrape_page, page): page for page in self.scrape_pages}
+        
+        try:
+            for future in as_completed(future_to_page, timeout=deadline.remaining()):
                 try:
                     page_emails = future.result()
                     emails.update(page_emails)
                 except:
                     continue
+        except FuturesTimeoutError:
+            print(f"⏱️ Time budget exhausted while scraping {domain}")
+        finally:
+            # Drop pages that have not started, running ones are bounded by their timeout
+            executor.shutdown(wait=False, cancel_futures=True)
         
         return {"emails": list(emails), "method": "web_scraping"}
     
+    def extract_emails_from_html(self, content):
+        """Extract emails from page text and mailto links"""
+        page_emails = set()
+        
+        # Parse with BeautifulSoup for better extraction
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
+        
+        text = soup.get_text()
+        
+        # Extract emails
+        found_emails = re.findall(
+            r'\b([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})\b',
+            text,
+            re.IGNORECASE
+        )
+        page_emails.update([email.lower() for email in found_emails])
+        
+        # Also check mailto links
+        mailto_links = soup.find_all('a', href=re.compile(r'^mailto:'))
+        for link in mailto_links:
+            email = link['href'].replace('mailto:', '').split('?')[0]
+            if '@' in email:
+                page_emails.add(email.lower())
+        
+        return page_emails
+    
     def linkedin_company_search(self, domain):
         """LinkedIn company search simulation"""
         emails = set()
@@ -420,86 +852,57 @@ class ComprehensiveEmailFinder:
         
         return score
     
-    def waterfall_email_validation(self, emails):
-        """Enhanced waterfall validation with debugging"""
-        validated_emails = []
+    def waterfall_email_validation(self, emails, deadline=None):
+        """Waterfall validation: local deliverability checks per domain, external APIs only for the rest"""
+        deadline = deadline or Deadline()
+        emails = emails[:10]  # Limit to prevent timeout
         
-        for email in emails[:10]:  # Limit to prevent timeout
-            print(f"🔍 Validating email: {email}")
-            
-            validation_result = None
-            
-            # Try rapid-email-verifier first
-            rapid_api = self.validation_apis[0]  # rapid-email-verifier
-            validation_result = self.validate_with_api(email, rapid_api)
+        # Format, MX/A, disposable and role checks, one DNS lookup per domain
+        results = self.deliverability.assess(emails, deadline)
+        
+        # One catch-all probe per domain that still has undecided candidates
+        for domain in self.deliverability.pending_domains(results):
+            if deadline.expired():
+                break
+            self.deliverability.mark_catch_all(results, domain, self.probe_catch_all(domain, deadline))
+        
+        # Spend rapid-email-verifier calls on the ambiguous remainder only
+        rapid_api = self.validation_apis[0]  # rapid-email-verifier
+        for email in self.deliverability.pending_emails(results):
+            if deadline.expired():
+                print("⏱️ Time budget exhausted, keeping local results for remaining emails")
+                break
             
-            # If rapid verifier fails or returns unknown, try alternative validation
-            if (not validation_result or 
-                validation_result.get('valid') == 'unknown' or 
-                validation_result.get('error')):
-                
-                print(f"Rapid verifier failed for {email}, trying alternative...")
-                validation_result = self.alternative_email_validation(email)
+            print(f"🔍 Validating email: {email}")
+            validation_result = self.validate_with_api(email, rapid_api, deadline)
             
-            validated_emails.append(validation_result)
+            if self.is_conclusive(validation_result):
+                results[email] = validation_result
+            else:
+                print(f"Rapid verifier failed for {email}, keeping local result")
             
             # Add small delay between requests
-            time.sleep(0.5)
+            time.sleep(deadline.timeout(0.5))
         
-        return validated_emails
+        return [results[email] for email in emails]
     
-    def alternative_email_validation(self, email):
-        """Alternative email validation methods"""
-        try:
-            # Method 1: Basic format validation
-            email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            format_valid = re.match(email_regex, email) is not None
-            
-            # Method 2: Domain validation
-            domain = email.split('@')[1] if '@' in email else ''
-            domain_valid = self.validate_domain(domain)
-            
-            # Method 3: Common patterns check
-            is_role_account = any(role in email.lower() for role in [
-                'admin', 'support', 'help', 'info', 'contact', 'sales',
-                'marketing', 'hr', 'careers', 'noreply', 'no-reply'
-            ])
-            
-            # Method 4: Disposable email check
-            disposable_domains = [
-                '10minutemail.com', 'tempmail.org', 'guerrillamail.com',
-                'mailinator.com', 'yopmail.com', '33mail.com'
-            ]
-            is_disposable = any(disp_domain in email.lower() for disp_domain in disposable_domains)
-            
-            # Combine validation results
-            likely_valid = (format_valid and domain_valid and not is_disposable)
-            
-            return {
-                "email": email,
-                "valid": likely_valid,
-                "deliverable": likely_valid and not is_role_account,
-                "disposable": is_disposable,
-                "role_account": is_role_account,
-                "validator": "alternative_validation",
-                "validation_details": {
-                    "format_valid": format_valid,
-                    "domain_valid": domain_valid,
-                    "is_disposable": is_disposable,
-                    "is_role_account": is_role_account
-                }
-            }
-            
-        except Exception as e:
-            return {
-                "email": email,
-                "valid": "unknown",
-                "error": f"Alternative validation error: {str(e)[:50]}",
-                "validator": "alternative_validation"
-            }
-
-    def validate_with_api(self, email, api_config):
+    def is_conclusive(self, validation_result):
+        """True if a validator returned a usable answer"""
+        return bool(validation_result and
+                    validation_result.get('valid') != 'unknown' and
+                    not validation_result.get('error'))
+    
+    def probe_catch_all(self, domain, deadline=None):
+        """Check an improbable address: True if accepted (catch-all), None if unknown"""
+        probe = self.deliverability.catch_all_probe_address(domain)
+        result = self.validate_with_api(probe, self.validation_apis[0], deadline)
+        if not self.is_conclusive(result):
+            return None
+        return self.deliverability.catch_all_from_probe(result)
+    
+    def validate_with_api(self, email, api_config, deadline=None):
         """Fixed API validation with proper request formats"""
+        deadline = deadline or Deadline()
         try:
             headers = {
                 'User-Agent': random.choice(self.user_agents),
@@ -507,52 +910,23 @@ class ComprehensiveEmailFinder:
             }
             
             if api_config["name"] == "rapid-email-verifier":
-                # Correct format for rapid-email-verifier
-                payload = {"email": email}
-                headers['Content-Type'] = 'application/json'
-                
-                response = requests.post(
+                headers, payload = self.rapid_verifier_request(email)
+                response = self.http.post(
                     api_config["url"],
                     json=payload,  # Use json parameter, not data
                     headers=headers,
-                    timeout=10
+                    timeout=deadline.timeout(10)
                 )
-                
-                print(f"🔍 Rapid verifier response for {email}: {response.status_code}")
-                print(f"Response text: {response.text[:200]}")
-                
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        print(f"Parsed data: {data}")
-                        
-                        return {
-                            "email": email,
-                            "valid": data.get("valid", False),
-                            "deliverable": data.get("deliverable", data.get("valid", False)),
-                            "disposable": data.get("disposable", False),
-                            "role_account": data.get("role_account", False),
-                            "validator": api_config["name"],
-                            "raw_response": data
-                        }
-                    except json.JSONDecodeError:
-                        print(f"JSON decode error for {email}")
-                        return {
-                            "email": email,
-                            "valid": "unknown",
-                            "error": "json_decode_error",
-                            "validator": api_config["name"],
-                            "raw_response": response.text
-                        }
+                return self.parse_rapid_response(email, api_config, response.status_code, response.text)
                 
             elif api_config["name"] == "emailvalidation-io":
                 # EmailValidation.io format
                 params = {"email": email}
-                response = requests.get(
+                response = self.http.get(
                     api_config["url"],
                     params=params,
                     headers=headers,
-                    timeout=10
+                    timeout=deadline.timeout(10)
                 )
                 
                 if response.status_code == 200:
@@ -566,60 +940,56 @@ class ComprehensiveEmailFinder:
                     }
             
             # If we get here, the API call failed
-            return {
-                "email": email,
-                "valid": "unknown",
-                "error": f"HTTP {response.status_code}",
-                "validator": api_config["name"]
-            }
+            return self.validator_error(email, api_config, f"HTTP {response.status_code}")
                 
         except requests.exceptions.RequestException as e:
-            return {
-                "email": email,
-                "valid": "unknown", 
-                "error": f"Request error: {str(e)[:50]}",
-                "validator": api_config["name"]
-            }
+            return self.validator_error(email, api_config, f"Request error: {str(e)[:50]}")
         except Exception as e:
-            return {
-                "email": email,
-                "valid": "unknown",
-                "error": f"General error: {str(e)[:50]}",
-                "validator": api_config["name"]
-            }
+            return self.validator_error(email, api_config, f"General error: {str(e)[:50]}")
+
+    def validator_error(self, email, api_config, error):
+        """Inconclusive validation result for a failed validator call"""
+        return {
+            "email": email,
+            "valid": "unknown",
+            "error": error,
+            "validator": api_config["name"]
+        }
 
-    def validate_domain(self, domain):
-        """Validate if domain exists and has MX record"""
+    def rapid_verifier_request(self, email):
+        """Headers and JSON body of a rapid-email-verifier call (sync and async)"""
+        headers = {
+            'User-Agent': random.choice(self.user_agents),
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+        return headers, {"email": email}
+
+    def parse_rapid_response(self, email, api_config, status, text):
+        """Validation result from a rapid-email-verifier status code and body (sync and async)"""
+        print(f"🔍 Rapid verifier response for {email}: {status}")
+        if status != 200:
+            return self.validator_error(email, api_config, f"HTTP {status}")
+        
         try:
-            import socket
-            import dns.resolver
-            
-            # Check if domain resolves
-            try:
-                socket.gethostbyname(domain)
-                domain_resolves = True
-            except:
-                domain_resolves = False
-            
-            # Check MX record
-            try:
-                mx_records = dns.resolver.resolve(domain, 'MX')
-                has_mx = len(mx_records) > 0
-            except:
-                has_mx = False
-            
-            return domain_resolves or has_mx
-            
-        except ImportError:
-            # If dns.resolver not available, do basic check
-            try:
-                import socket
-                socket.gethostbyname(domain)
-                return True
-            except:
-                return False
-        except:
-            return False
+            return self.build_rapid_result(email, api_config, json.loads(text))
+        except json.JSONDecodeError:
+            print(f"JSON decode error for {email}")
+            result = self.validator_error(email, api_config, "json_decode_error")
+            result["raw_response"] = text
+            return result
+
+    def build_rapid_result(self, email, api_config, data):
+        """Build a validation result from a rapid-email-verifier response"""
+        return {
+            "email": email,
+            "valid": data.get("valid", False),
+            "deliverable": data.get("deliverable", data.get("valid", False)),
+            "disposable": data.get("disposable", False),
+            "role_account": data.get("role_account", False),
+            "validator": api_config["name"],
+            "raw_response": data
+        }
 
     def debug_rapid_verifier(self, email):
         """Debug function to test rapid-email-verifier directly"""
@@ -667,8 +1037,663 @@ class ComprehensiveEmailFinder:
             print(f"❌ Debug error: {str(e)}")
             return None
 
-# Initialize email finder
+    # Async pipeline (used by the ASGI serving mode)
+    async def get_async_session(self):
+        """Return the shared aiohttp session, creating it inside the running loop"""
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=int(os.environ.get('ASYNC_HTTP_CONNECTIONS', 200)),
+                ttl_dns_cache=300,
+                ssl=False
+            )
+            self._async_session = aiohttp.ClientSession(connector=connector)
+        return self._async_session
+
+    async def close_async_session(self):
+        """Close the shared aiohttp session on shutdown"""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+
+    async def async_waterfall_email_search(self, domain, sources="all", limit=100, deadline=None,
+                                           target_count=None, min_score=100):
+        """Async waterfall_email_search: the same waterfall_plan, with the stages awaited"""
+        deadline = deadline or Deadline()
+        plan = self.waterfall_plan(domain, deadline, target_count, min_score)
+        try:
+            stage = next(plan)
+            while True:
+                stage = plan.send(await self.async_run_discovery_stage(stage['method'], domain, sources, limit, deadline))
+        except StopIteration as finished:
+            return finished.value
+
+    async def async_run_discovery_stage(self, method, domain, sources, limit, deadline):
+        """Async counterpart of run_discovery_stage"""
+        if method == "theHarvester":
+            return await self.async_run_theharvester(domain, sources, limit, deadline)
+        return await self.async_comprehensive_web_scraping(domain, deadline)
+
+    async def async_run_theharvester(self, domain, sources, limit, deadline=None):
+        """Run theHarvester as an asyncio subprocess with timeout and error handling"""
+        deadline = deadline or Deadline()
+        cmd = self.build_harvester_command(domain, sources, limit)
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd="/app/theHarvester"
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=deadline.timeout(60))
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                process.kill()
+                await process.wait()
+                raise
+            
+            output = stdout.decode(errors='ignore') + stderr.decode(errors='ignore')
+            emails = self.parse_harvester_output(output, domain)
+            return {"emails": emails, "method": "theHarvester"}
+        except Exception:
+            return {"emails": [], "method": "theHarvester", "error": "failed"}
+
+    async def async_comprehensive_web_scraping(self, domain, deadline=None):
+        """Async web scraping over the shared aiohttp session"""
+        deadline = deadline or Deadline()
+        session = await self.get_async_session()
+        semaphore = asyncio.Semaphore(5)
+        
+        async def scrape_page(page_path):
+            async with semaphore:
+                for protocol in ['https', 'http']:
+                    if deadline.expired():
+                        break
+                    try:
+                        url = f"{protocol}://{domain}{page_path}"
+                        async with session.get(
+                            url,
+                            timeout=aiohttp.ClientTimeout(total=deadline.timeout(10)),
+                            headers={'User-Agent': random.choice(self.user_agents)},
+                            allow_redirects=True
+                        ) as response:
+                            if response.status == 200:
+                                content = await response.read()
+                                # Parsing is CPU-bound, keep it off the event loop
+                                return await asyncio.to_thread(self.extract_emails_from_html, content)
+                    except Exception:
+                        continue
+            return set()
+        
+        emails = set()
+        tasks = [asyncio.ensure_future(scrape_page(page)) for page in self.scrape_pages]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+        finally:
+            # Cancel pages still in flight when the budget runs out or this stage is cancelled
+            unfinished = [task for task in tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                await asyncio.gather(*unfinished, return_exceptions=True)
+        
+        if pending:
+            print(f"⏱️ Time budget exhausted while scraping {domain}")
+        
+        for task in done:
+            if not task.cancelled() and task.exception() is None:
+                emails.update(task.result())
+        
+        return {"emails": list(emails), "method": "web_scraping"}
+
+    async def async_waterfall_email_validation(self, emails, deadline=None):
+        """Async waterfall validation: local deliverability checks, then rapid-email-verifier"""
+        deadline = deadline or Deadline()
+        emails = emails[:10]  # Limit to prevent timeout
+        
+        # DNS lookups are blocking, run them in the default executor
+        results = await asyncio.to_thread(self.deliverability.assess, emails, deadline)
+        
+        pending_domains = [] if deadline.expired() else self.deliverability.pending_domains(results)
+        probes = await asyncio.gather(*(self.async_probe_catch_all(domain, deadline) for domain in pending_domains))
+        for domain, catch_all in zip(pending_domains, probes):
+            self.deliverability.mark_catch_all(results, domain, catch_all)
+        
+        for email in self.deliverability.pending_emails(results):
+            if deadline.expired():
+                print("⏱️ Time budget exhausted, keeping local results for remaining emails")
+                break
+            
+            print(f"🔍 Validating email: {email}")
+            validation_result = await self.async_validate_with_rapid_verifier(email, deadline)
+            
+            if self.is_conclusive(validation_result):
+                results[email] = validation_result
+            else:
+                print(f"Rapid verifier failed for {email}, keeping local result")
+            
+            # Add small delay between requests without blocking the loop
+            await asyncio.sleep(deadline.timeout(0.5))
+        
+        return [results[email] for email in emails]
+
+    async def async_probe_catch_all(self, domain, deadline=None):
+        """Async catch-all probe, see probe_catch_all"""
+        probe = self.deliverability.catch_all_probe_address(domain)
+        result = await self.async_validate_with_rapid_verifier(probe, deadline)
+        if not self.is_conclusive(result):
+            return None
+        return self.deliverability.catch_all_from_probe(result)
+
+    async def async_validate_with_rapid_verifier(self, email, deadline=None):
+        """Validate a single email against rapid-email-verifier over aiohttp"""
+        deadline = deadline or Deadline()
+        api_config = self.validation_apis[0]  # rapid-email-verifier
+        
+        try:
+            session = await self.get_async_session()
+            headers, payload = self.rapid_verifier_request(email)
+            async with session.post(
+                api_config["url"],
+                json=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=deadline.timeout(10))
+            ) as response:
+                return self.parse_rapid_response(email, api_config, response.status, await response.text())
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return self.validator_error(email, api_config, f"Request error: {str(e)[:50]}")
+        except Exception as e:
+            return self.validator_error(email, api_config, f"General error: {str(e)[:50]}")
+
+
+class JobStore:
+    """SQLite-backed job store that checkpoints bulk runs domain by domain.
+    
+    Each domain's waterfall result is saved as soon as it finishes and its
+    validated result once validation completes, so a bulk job cut short by a
+    recycled or timed-out worker resumes from the last checkpoint when the
+    client retries with the job_id of the first response, and completed
+    domains are served straight from the store.
+    """
+    
+    def __init__(self, path=None, ttl=None):
+        self.path = path or os.environ.get('JOB_STORE_PATH', 'jobs.db')
+        self.ttl = ttl if ttl is not None else int(os.environ.get('JOB_STORE_TTL', 86400))
+        self.init_schema()
+    
+    @contextmanager
+    def connect(self):
+        """Short-lived connection, safe to use from any thread or worker"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+    
+    def init_schema(self):
+        """Create the database file and tables if missing"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self.connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    domains TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS job_domains (
+                    job_id TEXT NOT NULL,
+                    domain TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    search_result TEXT,
+                    domain_result TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, domain)
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)")
+        self.purge_expired()
+    
+    def purge_expired(self):
+        """Delete jobs older than the TTL together with their checkpoints"""
+        cutoff = time.time() - self.ttl
+        with self.connect() as db:
+            db.execute(
+                "DELETE FROM job_domains WHERE job_id IN (SELECT job_id FROM jobs WHERE created_at < ?)",
+                (cutoff,)
+            )
+            deleted = db.execute("DELETE FROM jobs WHERE created_at < ?", (cutoff,)).rowcount
+        if deleted:
+            print(f"🧹 Purged {deleted} expired jobs from the job store")
+    
+    def start_job(self, job_id, domains, params):
+        """Create the job, or reopen it if it exists and has not expired"""
+        # Sweep every expired job, not just this one, so the store stays bounded
+        self.purge_expired()
+        
+        now = time.time()
+        with self.connect() as db:
+            row = db.execute("SELECT created_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row:
+                # A reused job id may come with a different domain list, keep the latest
+                db.execute(
+                    "UPDATE jobs SET status = 'running', params = ?, domains = ?, updated_at = ? WHERE job_id = ?",
+                    (json.dumps(params), json.dumps(domains), now, job_id)
+                )
+            else:
+                db.execute(
+                    "INSERT INTO jobs (job_id, status, params, domains, created_at, updated_at) VALUES (?, 'running', ?, ?, ?, ?)",
+                    (job_id, json.dumps(params), json.dumps(domains), now, now)
+                )
+    
+    def load_checkpoints(self, job_id):
+        """Return {domain: checkpoint} for every domain saved so far"""
+        with self.connect() as db:
+            rows = db.execute(
+                "SELECT domain, status, search_result, domain_result FROM job_domains WHERE job_id = ?",
+                (job_id,)
+            ).fetchall()
+        
+        return {
+            row['domain']: {
+                "status": row['status'],
+                "search_result": json.loads(row['search_result']) if row['search_result'] else None,
+                "domain_result": json.loads(row['domain_result']) if row['domain_result'] else None
+            }
+            for row in rows
+        }
+    
+    def get_checkpoint(self, job_id, domain):
+        """Checkpoint of a single domain, or None (keeps streamed jobs out of memory)"""
+        with self.connect() as db:
+            row = db.execute(
+                "SELECT status, search_result, domain_result FROM job_domains WHERE job_id = ? AND domain = ?",
+                (job_id, domain)
+            ).fetchone()
+        
+        if not row:
+            return None
+        return {
+            "status": row['status'],
+            "search_result": json.loads(row['search_result']) if row['search_result'] else None,
+            "domain_result": json.loads(row['domain_result']) if row['domain_result'] else None
+        }
+    
+    def save_search_result(self, job_id, domain, search_result):
+        """Checkpoint a domain's waterfall result before validation runs"""
+        with self.connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO job_domains (job_id, domain, status, search_result, domain_result, updated_at) VALUES (?, ?, 'searched', ?, NULL, ?)",
+                (job_id, domain, json.dumps(search_result), time.time())
+            )
+    
+    def save_domain_result(self, job_id, domain, search_result, domain_result):
+        """Checkpoint a domain as complete with its final bulk result"""
+        with self.connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO job_domains (job_id, domain, status, search_result, domain_result, updated_at) VALUES (?, ?, 'complete', ?, ?, ?)",
+                (job_id, domain, json.dumps(search_result), json.dumps(domain_result), time.time())
+            )
+    
+    def finish_job(self, job_id, status="complete"):
+        """Mark a job as finished"""
+        with self.connect() as db:
+            db.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?", (status, time.time(), job_id))
+    
+    def get_job(self, job_id):
+        """Job metadata with its checkpoints, or None if unknown"""
+        with self.connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        
+        checkpoints = self.load_checkpoints(job_id)
+        # Streamed uploads do not record their domain list up front
+        domains = json.loads(row['domains']) or list(checkpoints)
+        return {
+            "job_id": job_id,
+            "status": row['status'],
+            "params": json.loads(row['params']),
+            "domains": domains,
+            "completed_domains": len([d for d in domains if checkpoints.get(d, {}).get('status') == 'complete']),
+            "total_domains": len(domains),
+            "created_at": row['created_at'],
+            "updated_at": row['updated_at'],
+            "results": [checkpoints[d]['domain_result'] for d in domains
+                        if checkpoints.get(d, {}).get('status') == 'complete']
+        }
+
+class SchedulerBusy(Exception):
+    """A flow's queue is full or its wait ran past max_wait, answered with a 429"""
+    
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class FairShareScheduler:
+    """Weighted fair queuing of pipeline work across clients and priority classes.
+    
+    Each (client, priority) pair is a flow with weight PRIORITY_WEIGHTS[priority]
+    times the client's weight. Free slots go to the waiter with the smallest
+    virtual finish tag among flows still under their concurrency quota, so
+    interactive lookups overtake queued bulk work without starving it. The
+    quota applies to each priority class separately and bulk work may not
+    take the last `interactive_reserve` slots, so neither a client's own bulk
+    run nor everyone else's holds up its single lookups.
+    
+    Admission control keeps one client from parking every server thread in
+    the queue: a flow may have at most `queue_factor` times its quota
+    waiting, and no wait lasts longer than `max_wait` seconds; both raise
+    SchedulerBusy. A wait cut short by the request deadline instead gets no
+    slot, and the expired deadline limits the pipeline to offline stages.
+    Quotas and metrics are per worker process.
+    """
+    
+    PRIORITY_WEIGHTS = {"interactive": 8, "bulk": 1}
+    MAX_TRACKED_CLIENTS = 1000
+    
+    def __init__(self, name, capacity, default_concurrency=2, client_limits=None, interactive_reserve=None,
+                 queue_factor=1, max_wait=None):
+        self.name = name
+        self.capacity = capacity
+        self.default_concurrency = default_concurrency
+        self.client_limits = client_limits or {}
+        self.queue_factor = queue_factor
+        self.max_wait = max_wait
+        if interactive_reserve is None:
+            interactive_reserve = capacity // 4
+        self.bulk_capacity = max(1, capacity - interactive_reserve)
+        self._lock = threading.Lock()
+        self._waiters = []
+        self._active = 0
+        self._active_bulk = 0
+        self._active_by_flow = {}
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._sequence = itertools.count()
+        self._metrics = OrderedDict()
+    
+    def client_concurrency(self, client, priority="interactive"):
+        """Concurrent slots a client may hold within one priority class"""
+        limits = self.client_limits.get(client, {})
+        return limits.get(f'{priority}_concurrency', limits.get('concurrency', self.default_concurrency))
+    
+    def client_weight(self, client):
+        """Client weight, multiplied with the priority weight"""
+        return self.client_limits.get(client, {}).get('weight', 1)
+    
+    def _enqueue(self, client, priority, grant):
+        """Tag and queue a waiter, caller holds the lock. Raises SchedulerBusy if the flow's queue is full"""
+        queued = len([w for w in self._waiters if w['client'] == client and w['priority'] == priority])
+        if queued >= max(1, int(self.client_concurrency(client, priority) * self.queue_factor)):
+            self._stats(client, priority)['rejected'] += 1
+            raise SchedulerBusy(f"Too many queued {priority} requests for this client on the {self.name} pipeline")
+        
+        weight = self.PRIORITY_WEIGHTS.get(priority, 1) * self.client_weight(client)
+        flow = (client, priority)
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        finish = start + 1.0 / weight
+        self._last_finish[flow] = finish
+        
+        if len(self._last_finish) > self.MAX_TRACKED_CLIENTS:
+            # Forget idle flows, they restart from the virtual clock like new ones
+            busy = set(self._active_by_flow) | {(w['client'], w['priority']) for w in self._waiters} | {flow}
+            self._last_finish = {key: tag for key, tag in self._last_finish.items() if key in busy}
+        
+        waiter = {
+            "client": client,
+            "priority": priority,
+            "start": start,
+            "finish": finish,
+            "sequence": next(self._sequence),
+            "enqueued_at": time.monotonic(),
+            "granted": False,
+            "grant": grant
+        }
+        self._waiters.append(waiter)
+        self._dispatch()
+        return waiter
+    
+    def _dispatch(self):
+        """Hand free slots to eligible waiters with the smallest finish tags, caller holds the lock"""
+        while self._active < self.capacity and self._waiters:
+            eligible = [w for w in self._waiters if self._eligible(w['client'], w['priority'])]
+            if not eligible:
+                return
+            
+            waiter = min(eligible, key=lambda w: (w['finish'], w['sequence']))
+            self._waiters.remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter['start'])
+            self._active += 1
+            if waiter['priority'] == "bulk":
+                self._active_bulk += 1
+            flow = (waiter['client'], waiter['priority'])
+            self._active_by_flow[flow] = self._active_by_flow.get(flow, 0) + 1
+            waiter['granted'] = True
+            
+            stats = self._stats(waiter['client'], waiter['priority'])
+            stats['granted'] += 1
+            stats['waits'].append(time.monotonic() - waiter['enqueued_at'])
+            waiter['grant']()
+    
+    def _eligible(self, client, priority):
+        """True if the flow is under its quota (and bulk under bulk_capacity), caller holds the lock"""
+        if priority == "bulk" and self._active_bulk >= self.bulk_capacity:
+            return False
+        return self._active_by_flow.get((client, priority), 0) < self.client_concurrency(client, priority)
+    
+    def _release(self, client, priority):
+        """Free a slot, caller holds the lock"""
+        self._active -= 1
+        if priority == "bulk":
+            self._active_bulk -= 1
+        flow = (client, priority)
+        self._active_by_flow[flow] -= 1
+        if not self._active_by_flow[flow]:
+            del self._active_by_flow[flow]
+        self._dispatch()
+    
+    def _settle(self, waiter):
+        """After waiting: True if granted, otherwise drop the waiter as timed out"""
+        with self._lock:
+            if waiter['granted']:
+                return True
+            self._waiters.remove(waiter)
+            self._stats(waiter['client'], waiter['priority'])['timeouts'] += 1
+            return False
+    
+    def _wait_limit(self, deadline):
+        """How long to wait for a slot and whether max_wait (not the deadline) sets it"""
+        remaining = deadline.remaining() if deadline else None
+        if self.max_wait is not None and (remaining is None or self.max_wait < remaining):
+            return self.max_wait, True
+        return remaining, False
+    
+    def _busy(self, priority):
+        """SchedulerBusy for a waiter that gave up after max_wait"""
+        return SchedulerBusy(
+            f"No {self.name} slot for {priority} work within {self.max_wait:g}s, try again later",
+            retry_after=max(1, math.ceil(self.max_wait))
+        )
+    
+    def _abandon(self, waiter):
+        """Waiter cancelled: give back its slot or leave the queue"""
+        with self._lock:
+            if waiter['granted']:
+                self._release(waiter['client'], waiter['priority'])
+            else:
+                self._waiters.remove(waiter)
+    
+    def _stats(self, client, priority):
+        """Metrics bucket for a client and priority, caller holds the lock.
+        
+        Only the MAX_TRACKED_CLIENTS most recently seen clients are kept.
+        """
+        if client in self._metrics:
+            self._metrics.move_to_end(client)
+        elif len(self._metrics) >= self.MAX_TRACKED_CLIENTS:
+            self._metrics.popitem(last=False)
+        
+        return self._metrics.setdefault(client, {}).setdefault(priority, {
+            "granted": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "waits": deque(maxlen=1000)
+        })
+    
+    @contextmanager
+    def slot(self, client, priority="interactive", deadline=None):
+        """Block until a slot is granted (or the deadline passes), yields whether it was.
+        
+        Raises SchedulerBusy when the flow's queue is full or max_wait runs out.
+        """
+        event = threading.Event()
+        with self._lock:
+            waiter = self._enqueue(client, priority, event.set)
+        
+        timeout, limited = self._wait_limit(deadline)
+        event.wait(timeout)
+        granted = self._settle(waiter)
+        if not granted and limited:
+            raise self._busy(priority)
+        try:
+            yield granted
+        finally:
+            if granted:
+                with self._lock:
+                    self._release(client, priority)
+    
+    @asynccontextmanager
+    async def async_slot(self, client, priority="interactive", deadline=None):
+        """Async counterpart of slot, waits on the event loop instead of a thread"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def grant():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+        
+        with self._lock:
+            waiter = self._enqueue(client, priority, grant)
+        
+        timeout, limited = self._wait_limit(deadline)
+        try:
+            await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        
+        granted = self._settle(waiter)
+        if not granted and limited:
+            raise self._busy(priority)
+        try:
+            yield granted
+        finally:
+            if granted:
+                with self._lock:
+                    self._release(client, priority)
+    
+    def metrics(self):
+        """Per-client, per-priority queue wait metrics"""
+        with self._lock:
+            queued = {}
+            for waiter in self._waiters:
+                queued[waiter['client']] = queued.get(waiter['client'], 0) + 1
+            active = {}
+            for (client, priority), count in self._active_by_flow.items():
+                active[client] = active.get(client, 0) + count
+            
+            clients = {}
+            for client in set(self._metrics) | set(queued) | set(active):
+                priorities = {}
+                for priority, stats in self._metrics.get(client, {}).items():
+                    waits = sorted(stats['waits'])
+                    priorities[priority] = {
+                        "active": self._active_by_flow.get((client, priority), 0),
+                        "concurrency_quota": self.client_concurrency(client, priority),
+                        "granted": stats['granted'],
+                        "timeouts": stats['timeouts'],
+                        "rejected": stats['rejected'],
+                        "wait_ms_p50": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                        "wait_ms_p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 1) if waits else 0.0,
+                        "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0
+                    }
+                clients[client] = {
+                    "active": active.get(client, 0),
+                    "queued": queued.get(client, 0),
+                    "priorities": priorities
+                }
+            
+            return {
+                "capacity": self.capacity,
+                "bulk_capacity": self.bulk_capacity,
+                "queue_factor": self.queue_factor,
+                "max_wait": self.max_wait,
+                "active": self._active,
+                "active_bulk": self._active_bulk,
+                "queued": len(self._waiters),
+                "clients": clients
+            }
+
+def client_id(api_key, remote_addr):
+    """Scheduler identity for a caller, keys and addresses are hashed so metrics never expose them"""
+    if api_key:
+        return "key-" + hashlib.sha1(api_key.encode('utf-8')).hexdigest()[:12]
+    return "ip-" + hashlib.sha1((remote_addr or 'unknown').encode('utf-8')).hexdigest()[:12]
+
+def forwarded_client_addr(forwarded_for, remote_addr):
+    """Client address behind TRUSTED_PROXY_HOPS proxies, picked from X-Forwarded-For like ProxyFix"""
+    values = [value.strip() for value in (forwarded_for or '').split(',') if value.strip()]
+    if TRUSTED_PROXY_HOPS and len(values) >= TRUSTED_PROXY_HOPS:
+        return values[-TRUSTED_PROXY_HOPS]
+    return remote_addr
+
+def load_client_limits():
+    """Per-API-key quotas from CLIENT_QUOTAS, e.g. {"<key>": {"concurrency": 8, "weight": 2}}.
+    
+    `concurrency` applies to each priority class; `interactive_concurrency`
+    and `bulk_concurrency` override it for one class.
+    """
+    try:
+        quotas = json.loads(os.environ.get('CLIENT_QUOTAS', '{}'))
+    except ValueError:
+        print("⚠️ CLIENT_QUOTAS is not valid JSON, using defaults")
+        quotas = {}
+    return {client_id(key, None): limits for key, limits in quotas.items()}
+
+# Initialize email finder and the bulk job store
 email_finder = ComprehensiveEmailFinder()
+job_store = JobStore()
+
+# Fair-share schedulers in front of the discovery and validation pipelines.
+# A client may queue SCHEDULER_QUEUE_FACTOR times its quota per priority class
+# and wait at most SCHEDULER_MAX_WAIT seconds for a slot, beyond that it gets a 429.
+client_limits = load_client_limits()
+default_client_concurrency = int(os.environ.get('DEFAULT_CLIENT_CONCURRENCY', 2))
+scheduler_queue_factor = float(os.environ.get('SCHEDULER_QUEUE_FACTOR', 1))
+scheduler_max_wait = float(os.environ.get('SCHEDULER_MAX_WAIT', 60))
+search_scheduler = FairShareScheduler(
+    "search", int(os.environ.get('SEARCH_CAPACITY', 8)), default_client_concurrency, client_limits,
+    int(os.environ['SEARCH_INTERACTIVE_RESERVE']) if 'SEARCH_INTERACTIVE_RESERVE' in os.environ else None,
+    scheduler_queue_factor, scheduler_max_wait
+)
+validation_scheduler = FairShareScheduler(
+    "validation", int(os.environ.get('VALIDATION_CAPACITY', 4)), default_client_concurrency, client_limits,
+    int(os.environ['VALIDATION_INTERACTIVE_RESERVE']) if 'VALIDATION_INTERACTIVE_RESERVE' in os.environ else None,
+    scheduler_queue_factor, scheduler_max_wait
+)
 
 @app.route('/health', methods=['GET'])
 def health_check_render():
@@ -689,13 +1714,21 @@ def home():
             "Google dorking techniques",
             "Smart pattern generation",
             "Multi-API email validation",
-            "Domain relevance scoring"
+            "Local MX-grouped deliverability checks",
+            "Domain relevance scoring",
+            "Async (ASGI) serving mode",
+            "Compressed JSON responses (gzip/br, compact mode)",
+            "Resumable bulk jobs (retry with the returned job_id)"
         ],
         "endpoints": {
             "health": "GET /health",
             "api_health": "GET /api/health",
             "single_domain": "POST /api/find-emails",
-            "bulk_domains": "POST /api/find-emails-bulk"
+            "bulk_domains": "POST /api/find-emails-bulk",
+            "bulk_sharded": "POST /api/find-emails-bulk-sharded",
+            "bulk_upload": "POST /api/find-emails-bulk-upload (CSV/NDJSON body)",
+            "bulk_job_status": "GET /api/jobs/<job_id>",
+            "scheduler_metrics": "GET /api/scheduler/metrics"
         },
         "waterfall_methods": [
             "1. theHarvester (OSINT)",
@@ -724,63 +1757,354 @@ def health_check_api():
         }
     }), 200
 
+def normalize_domain(domain):
+    """Strip scheme, www. prefix and path from a domain input"""
+    domain = domain.strip().replace('http://', '').replace('https://', '').replace('www.', '')
+    if '/' in domain:
+        domain = domain.split('/')[0]
+    return domain
+
+def parse_time_budget(data):
+    """Deadline from the optional `time_budget` (seconds) field, None if invalid"""
+    budget = data.get('time_budget')
+    if budget is None:
+        return Deadline()
+    try:
+        budget = float(budget)
+    except (TypeError, ValueError):
+        return None
+    return Deadline(budget) if budget > 0 else None
+
+def parse_yield_target(data):
+    """Early-termination options `target_count` and `min_score`, None if invalid"""
+    target_count = data.get('target_count')
+    min_score = data.get('min_score', 100)
+    try:
+        target_count = int(target_count) if target_count is not None else None
+        min_score = int(min_score)
+    except (TypeError, ValueError):
+        return None
+    if target_count is not None and target_count <= 0:
+        return None
+    return {"target_count": target_count, "min_score": min_score}
+
+def parse_pipeline_options(data):
+    """Time budget, yield target and response shape shared by every discovery endpoint.
+    
+    Returns (options, None), or (None, error message) for a 400 response.
+    """
+    # Overall time budget shared by every stage and outbound call
+    deadline = parse_time_budget(data)
+    if deadline is None:
+        return None, "time_budget must be a positive number of seconds"
+    
+    # Optional early termination once enough good emails are found
+    target = parse_yield_target(data)
+    if target is None:
+        return None, "target_count must be a positive integer and min_score an integer"
+    
+    # Checked before any work runs, a bad value would otherwise fail while shaping the response
+    shape = parse_response_shape(data)
+    if shape is None:
+        return None, "fields must be a list of field names or a comma-separated string"
+    
+    return {"deadline": deadline, "target": target, "shape": shape}, None
+
+def parse_single_request(data):
+    """Validate a single-domain request body (Flask and ASGI), returns (options, error message)"""
+    if not data:
+        return None, "JSON payload required"
+    
+    domain = data.get('domain', '').strip()
+    if not domain:
+        return None, "Domain parameter required"
+    
+    options, error = parse_pipeline_options(data)
+    if error:
+        return None, error
+    
+    options.update({
+        "domain": normalize_domain(domain),
+        "validate": data.get('validate', True),
+        "sources": data.get('sources', 'all')
+    })
+    return options, None
+
+def parse_bulk_request(data, max_domains=3, mode="bulk comprehensive"):
+    """Validate a bulk request body (Flask and ASGI), returns (options, error message)"""
+    if not data:
+        return None, "JSON payload required"
+    
+    domains = data.get('domains', [])
+    if not domains or len(domains) > max_domains:
+        return None, f"Provide 1-{max_domains} domains for {mode} processing"
+    
+    options, error = parse_pipeline_options(data)
+    if error:
+        return None, error
+    
+    options.update({
+        "domains": domains,
+        "clean_domains": [normalize_domain(domain) for domain in domains],
+        "validate": data.get('validate', True),
+        "sources": data.get('sources', 'google,bing,yahoo')  # Limited for bulk
+    })
+    return options, None
+
+def parse_response_shape(data):
+    """Response options: `fields` (list or comma string) and `compact`, None if invalid"""
+    fields = data.get('fields')
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    elif fields is not None and not (isinstance(fields, list) and all(isinstance(f, str) for f in fields)):
+        return None
+    return {"fields": set(fields) if fields else None, "compact": bool(data.get('compact', False))}
+
+def shape_result(entry, fields=None, compact=False):
+    """Apply the fields/compact options to one response entry"""
+    if compact and 'validated_emails' in entry:
+        entry = dict(entry)
+        entry['validated_emails'] = [
+            {key: value for key, value in validated.items() if key not in COMPACT_OMIT_FIELDS}
+            for validated in entry['validated_emails']
+        ]
+    
+    if fields:
+        entry = {key: value for key, value in entry.items() if key in fields or key in ('success', 'domain')}
+    
+    return entry
+
+def shape_bulk_response(response_data, shape):
+    """Apply the fields/compact options to every bulk result, totals are kept"""
+    response_data["results"] = [shape_result(r, **shape) for r in response_data["results"]]
+    return response_data
+
+def build_single_response(domain, sources, result, validated=None, deadline=None):
+    """Build the single-domain response payload"""
+    response_data = {
+        "success": True,
+        "domain": domain,
+        "emails_found": result['emails'],
+        "total_found": result['count'],
+        "methods_used": result['methods_used'],
+        "waterfall_steps": result['waterfall_steps'],
+        "sources_requested": sources,
+        "status": result['status'],
+        "time_budget": deadline.budget if deadline else None,
+        "budget_exhausted": bool(deadline and deadline.expired()),
+        "stages_skipped": result.get('stages_skipped', []),
+        "target_reached": result.get('target_reached', False)
+    }
+    
+    if validated is not None:
+        valid_emails = [e for e in validated if e.get('valid') == True]
+        response_data.update({
+            "validated_emails": validated,
+            "validation_summary": {
+                "total_validated": len(validated),
+                "total_valid": len(valid_emails),
+                "validation_enabled": True,
+                "apis_used": len(email_finder.validation_apis)
+            }
+        })
+    else:
+        response_data["validation_summary"] = {"validation_enabled": False}
+    
+    return response_data
+
+def build_bulk_domain_result(domain, result, validated=None, budget_exhausted=False):
+    """Build one entry of the bulk response results list"""
+    domain_result = {
+        "domain": domain,
+        "emails_found": result['emails'],
+        "total_found": result['count'],
+        "methods_used": result['methods_used'],
+        "waterfall_steps": result['waterfall_steps'],
+        "budget_exhausted": budget_exhausted,
+        "stages_skipped": result.get('stages_skipped', []),
+        "target_reached": result.get('target_reached', False)
+    }
+    
+    if validated is not None:
+        valid_count = len([e for e in validated if e.get('valid') == True])
+        domain_result.update({
+            "validated_emails": validated,
+            "validation_summary": {
+                "total_validated": len(validated),
+                "total_valid": valid_count
+            }
+        })
+    
+    return domain_result
+
+def build_bulk_response(results, domains, validate, job_id=None, resumed_domains=0, deadline=None):
+    """Build the bulk response payload with totals"""
+    total_emails = sum(r['total_found'] for r in results)
+    total_valid = sum(r.get('validation_summary', {}).get('total_valid', 0) for r in results)
+    total_methods = sum(r['waterfall_steps'] for r in results)
+    
+    response_data = {
+        "success": True,
+        "results": results,
+        "summary": {
+            "total_domains_processed": len(domains),
+            "total_emails_found": total_emails,
+            "total_valid_emails": total_valid,
+            "total_methods_used": total_methods,
+            "average_methods_per_domain": round(total_methods / len(domains), 1),
+            "validation_enabled": validate,
+            "resumed_domains": resumed_domains,
+            "time_budget": deadline.budget if deadline else None,
+            "budget_exhausted": bool(deadline and deadline.expired())
+        }
+    }
+    
+    if job_id:
+        response_data["job_id"] = job_id
+    
+    return response_data
+
+def start_bulk_job(data, clean_domains, validate, sources, target=None):
+    """Open the persistent job for a bulk request.
+    
+    Every request without a `job_id` is a fresh job; sending back the job_id
+    of an earlier response resumes that job from its checkpoints.
+    """
+    params = {"validate": validate, "sources": sources, **(target or {})}
+    job_id = data.get('job_id') or uuid.uuid4().hex[:16]
+    job_store.start_job(job_id, clean_domains, params)
+    return job_id, job_store.load_checkpoints(job_id)
+
+def count_resumed(clean_domains, checkpoints):
+    """Number of domains already complete in the job store"""
+    return len([d for d in clean_domains if checkpoints.get(d, {}).get('status') == 'complete'])
+
+def request_client_id():
+    """Scheduler identity of the current Flask request (X-API-Key, else client IP)"""
+    return client_id(request.headers.get('X-API-Key'), request.remote_addr)
+
+def busy_payload(error, job_id=None):
+    """429 body for a request turned away by a scheduler, a bulk job_id lets the client resume"""
+    payload = {"success": False, "error": str(error), "retry_after": error.retry_after}
+    if job_id:
+        payload["job_id"] = job_id
+    return payload
+
+def scheduler_busy_response(error, job_id=None):
+    """Flask 429 response with Retry-After for a SchedulerBusy error"""
+    return jsonify(busy_payload(error, job_id)), 429, {"Retry-After": str(error.retry_after)}
+
+def bulk_domain_plan(clean_domain, validate, job_id, checkpoint, deadline):
+    """Checkpoint and resume logic for one bulk domain, shared by every bulk pipeline.
+    
+    A generator in the style of waterfall_plan: it yields the I/O steps
+    ("search", None), ("validate", emails) and ("store", write) and expects
+    each step's outcome back through send(); it returns the domain result.
+    """
+    if checkpoint and checkpoint['status'] == 'complete':
+        print(f"♻️ Serving checkpointed result for: {clean_domain}")
+        return checkpoint['domain_result']
+    
+    print(f"🎯 Processing bulk domain: {clean_domain}")
+    
+    if checkpoint and checkpoint['search_result']:
+        # Waterfall already ran before the last interruption
+        result = checkpoint['search_result']
+    else:
+        result = yield "search", None
+        # Partial results cut short by the time budget are not checkpointed
+        if not result['budget_exhausted']:
+            yield "store", partial(job_store.save_search_result, job_id, clean_domain, result)
+    
+    # Add validation
+    validated = None
+    if validate and result['emails']:
+        validated = yield "validate", result['emails'][:8]  # Limit for bulk
+    
+    domain_result = build_bulk_domain_result(clean_domain, result, validated, deadline.expired())
+    if not deadline.expired():
+        yield "store", partial(job_store.save_domain_result, job_id, clean_domain, result, domain_result)
+    return domain_result
+
+def process_bulk_domain(clean_domain, sources, validate, job_id, checkpoint=None, deadline=None, target=None,
+                        client="anonymous"):
+    """Search and validate one bulk domain, resuming from its checkpoint"""
+    deadline = deadline or Deadline()
+    plan = bulk_domain_plan(clean_domain, validate, job_id, checkpoint, deadline)
+    try:
+        step, argument = next(plan)
+        while True:
+            if step == "search":
+                # Run waterfall search with limited sources for speed, queued behind interactive lookups
+                with search_scheduler.slot(client, "bulk", deadline):
+                    outcome = email_finder.waterfall_email_search(
+                        clean_domain, sources, limit=30, deadline=deadline, **(target or {})
+                    )
+            elif step == "validate":
+                with validation_scheduler.slot(client, "bulk", deadline):
+                    outcome = email_finder.waterfall_email_validation(argument, deadline)
+            else:
+                outcome = argument()
+            step, argument = plan.send(outcome)
+    except StopIteration as finished:
+        return finished.value
+
+async def async_process_bulk_domain(clean_domain, sources, validate, job_id, checkpoint=None, deadline=None,
+                                    target=None, client="anonymous"):
+    """Async process_bulk_domain: the same bulk_domain_plan, with I/O awaited"""
+    deadline = deadline or Deadline()
+    plan = bulk_domain_plan(clean_domain, validate, job_id, checkpoint, deadline)
+    try:
+        step, argument = next(plan)
+        while True:
+            if step == "search":
+                async with search_scheduler.async_slot(client, "bulk", deadline):
+                    outcome = await email_finder.async_waterfall_email_search(
+                        clean_domain, sources, limit=30, deadline=deadline, **(target or {})
+                    )
+            elif step == "validate":
+                async with validation_scheduler.async_slot(client, "bulk", deadline):
+                    outcome = await email_finder.async_waterfall_email_validation(argument, deadline)
+            else:
+                # SQLite calls are blocking, run them in the default executor
+                outcome = await asyncio.to_thread(argument)
+            step, argument = plan.send(outcome)
+    except StopIteration as finished:
+        return finished.value
+
 @app.route('/api/find-emails', methods=['POST'])
 def find_emails_single():
     """Single domain comprehensive email discovery"""
     try:
         data = request.get_json()
-        if not data:
-            return jsonify({"error": "JSON payload required"}), 400
-            
-        domain = data.get('domain', '').strip()
-        validate = data.get('validate', True)
-        sources = data.get('sources', 'all')
-        
-        if not domain:
-            return jsonify({"error": "Domain parameter required"}), 400
+        options, error = parse_single_request(data)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Clean domain input
-        domain = domain.replace('http://', '').replace('https://', '').replace('www.', '')
-        if '/' in domain:
-            domain = domain.split('/')[0]
+        domain, validate, sources = options['domain'], options['validate'], options['sources']
+        deadline, target = options['deadline'], options['target']
         
         print(f"🎯 Starting comprehensive email discovery for: {domain}")
         
         # Run waterfall email search
-        result = email_finder.waterfall_email_search(domain, sources)
-        
-        response_data = {
-            "success": True,
-            "domain": domain,
-            "emails_found": result['emails'],
-            "total_found": result['count'],
-            "methods_used": result['methods_used'],
-            "waterfall_steps": result['waterfall_steps'],
-            "sources_requested": sources,
-            "status": result['status']
-        }
+        client = request_client_id()
+        with search_scheduler.slot(client, "interactive", deadline):
+            result = email_finder.waterfall_email_search(domain, sources, deadline=deadline, **target)
         
         # Email validation
+        validated = None
         if validate and result['emails']:
             print(f"🔍 Validating {len(result['emails'])} emails...")
-            validated = email_finder.waterfall_email_validation(result['emails'])
-            valid_emails = [e for e in validated if e.get('valid') == True]
-            
-            response_data.update({
-                "validated_emails": validated,
-                "validation_summary": {
-                    "total_validated": len(validated),
-                    "total_valid": len(valid_emails),
-                    "validation_enabled": True,
-                    "apis_used": len(email_finder.validation_apis)
-                }
-            })
-        else:
-            response_data["validation_summary"] = {"validation_enabled": False}
+            with validation_scheduler.slot(client, "interactive", deadline):
+                validated = email_finder.waterfall_email_validation(result['emails'], deadline)
         
         print(f"✅ Completed: Found {result['count']} emails using {result['waterfall_steps']} methods")
-        return jsonify(response_data), 200
+        return jsonify(shape_result(
+            build_single_response(domain, sources, result, validated, deadline), **options['shape']
+        )), 200
         
+    except SchedulerBusy as e:
+        return scheduler_busy_response(e)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -791,77 +2115,686 @@ def find_emails_single():
 @app.route('/api/find-emails-bulk', methods=['POST'])
 def find_emails_bulk():
     """Bulk domain processing with waterfall enrichment"""
+    job_id = None
     try:
         data = request.get_json()
-        if not data:
-            return jsonify({"error": "JSON payload required"}), 400
-            
-        domains = data.get('domains', [])
-        validate = data.get('validate', True)
-        sources = data.get('sources', 'google,bing,yahoo')  # Limited for bulk
+        # Conservative limit of 3 domains for comprehensive search, one time budget for the batch
+        options, error = parse_bulk_request(data)
+        if error:
+            return jsonify({"error": error}), 400
         
-        if not domains or len(domains) > 3:  # Conservative limit for comprehensive search
-            return jsonify({"error": "Provide 1-3 domains for bulk comprehensive processing"}), 400
+        domains, clean_domains = options['domains'], options['clean_domains']
+        validate, sources = options['validate'], options['sources']
+        deadline, target = options['deadline'], options['target']
         
+        # Completed domains are served from the job store on retry
+        job_id, checkpoints = start_bulk_job(data, clean_domains, validate, sources, target)
+        
+        # Bulk work is scheduled at bulk priority for this client
+        client = request_client_id()
         results = []
         
-        for domain in domains:
-            # Clean domain
-            clean_domain = domain.strip().replace('http://', '').replace('https://', '').replace('www.', '')
-            if '/' in clean_domain:
-                clean_domain = clean_domain.split('/')[0]
-            
-            print(f"🎯 Processing bulk domain: {clean_domain}")
-            
-            # Run waterfall search with limited sources for speed
-            result = email_finder.waterfall_email_search(clean_domain, sources, limit=30)
-            
-            domain_result = {
-                "domain": clean_domain,
-                "emails_found": result['emails'],
-                "total_found": result['count'],
-                "methods_used": result['methods_used'],
-                "waterfall_steps": result['waterfall_steps']
-            }
-            
-            # Add validation
-            if validate and result['emails']:
-                validated = email_finder.waterfall_email_validation(result['emails'][:8])  # Limit for bulk
-                valid_count = len([e for e in validated if e.get('valid') == True])
-                domain_result.update({
-                    "validated_emails": validated,
-                    "validation_summary": {
-                        "total_validated": len(validated),
-                        "total_valid": valid_count
-                    }
-                })
-            
-            results.append(domain_result)
+        for clean_domain in clean_domains:
+            results.append(process_bulk_domain(
+                clean_domain, sources, validate, job_id, checkpoints.get(clean_domain), deadline, target, client
+            ))
         
-        # Calculate totals
-        total_emails = sum(r['total_found'] for r in results)
-        total_valid = sum(r.get('validation_summary', {}).get('total_valid', 0) for r in results)
-        total_methods = sum(r['waterfall_steps'] for r in results)
+        job_store.finish_job(job_id, "partial" if deadline.expired() else "complete")
         
-        return jsonify({
-            "success": True,
-            "results": results,
-            "summary": {
-                "total_domains_processed": len(domains),
-                "total_emails_found": total_emails,
-                "total_valid_emails": total_valid,
-                "total_methods_used": total_methods,
-                "average_methods_per_domain": round(total_methods / len(domains), 1),
-                "validation_enabled": validate
-            }
-        }), 200
+        return jsonify(shape_bulk_response(build_bulk_response(
+            results, domains, validate, job_id, count_resumed(clean_domains, checkpoints), deadline
+        ), options['shape'])), 200
         
+    except SchedulerBusy as e:
+        # Domains finished so far are checkpointed, retrying with the job_id resumes
+        job_store.finish_job(job_id, "partial")
+        return scheduler_busy_response(e, job_id)
     except Exception as e:
         return jsonify({
             "success": False,
             "error": f"Bulk processing error: {str(e)}"
         }), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_bulk_job(job_id):
+    """Progress and checkpointed results of a bulk job"""
+    job = job_store.get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found", "job_id": job_id}), 404
+    return jsonify({"success": True, **job}), 200
+
+@app.route('/api/scheduler/metrics', methods=['GET'])
+def scheduler_metrics():
+    """Per-client quotas, queue depth and queue-wait percentiles"""
+    return jsonify({
+        "search": search_scheduler.metrics(),
+        "validation": validation_scheduler.metrics(),
+        "priority_weights": FairShareScheduler.PRIORITY_WEIGHTS
+    }), 200
+
+# Sharded bulk mode: the searches and validations of large domain lists run in
+# a process pool. Worker processes are spawned and import this module, so each
+# builds its own ComprehensiveEmailFinder and HTTP pools. The parent drives
+# bulk_domain_plan for every domain and takes the scheduler slot before handing
+# a step to the pool, so client quotas, the bulk cap, the interactive reserve
+# and the scheduler metrics cover sharded work like any other bulk request.
+#
+# Every gunicorn worker owns a pool, so by default the container's cores are
+# divided between the web workers gunicorn runs (see serving.py), and a pool
+# left idle for SHARD_POOL_IDLE seconds is shut down to release its processes.
+
+shard_workers = int(os.environ.get('SHARD_WORKERS', max(1, container_cpus() // web_workers())))
+shard_pool_idle = float(os.environ.get('SHARD_POOL_IDLE', 300))
+shard_pool = None
+shard_pool_users = 0
+shard_pool_timer = None
+shard_pool_lock = threading.Lock()
+
+@contextmanager
+def shard_pool_lease():
+    """Process pool for one sharded run, created on first use and kept while in use"""
+    global shard_pool, shard_pool_users, shard_pool_timer
+    with shard_pool_lock:
+        if shard_pool_timer is not None:
+            shard_pool_timer.cancel()
+            shard_pool_timer = None
+        if shard_pool is None:
+            shard_pool = ProcessPoolExecutor(
+                max_workers=shard_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        shard_pool_users += 1
+        pool = shard_pool
+    
+    try:
+        yield pool
+    finally:
+        with shard_pool_lock:
+            shard_pool_users -= 1
+            if shard_pool_users == 0 and shard_pool is not None:
+                shard_pool_timer = threading.Timer(shard_pool_idle, shutdown_idle_shard_pool)
+                shard_pool_timer.daemon = True
+                shard_pool_timer.start()
+
+def shutdown_idle_shard_pool():
+    """Release the pool's processes once no sharded run has used it for a while"""
+    global shard_pool, shard_pool_timer
+    with shard_pool_lock:
+        shard_pool_timer = None
+        if shard_pool is None or shard_pool_users:
+            return
+        print(f"💤 Shutting down idle shard pool ({shard_workers} processes)")
+        shard_pool.shutdown(wait=False, cancel_futures=True)
+        shard_pool = None
+
+def reset_shard_pool():
+    """Drop a broken pool so the next request starts a fresh one"""
+    global shard_pool
+    with shard_pool_lock:
+        if shard_pool is not None:
+            shard_pool.shutdown(wait=False, cancel_futures=True)
+        shard_pool = None
+
+def shard_search(domain, sources, expires_at=None, target=None):
+    """Waterfall search of one bulk domain inside a worker process"""
+    # Deadlines do not cross processes, rebuild one from the absolute expiry so
+    # domains queued behind others do not start with a fresh budget
+    return email_finder.waterfall_email_search(
+        domain, sources, limit=30, deadline=Deadline.until(expires_at), **(target or {})
+    )
+
+def shard_validate(emails, expires_at=None):
+    """Validation of one bulk domain's emails inside a worker process"""
+    return email_finder.waterfall_email_validation(emails, Deadline.until(expires_at))
+
+def process_sharded_domain(pool, clean_domain, sources, validate, job_id, checkpoint=None, deadline=None,
+                           target=None, client="anonymous"):
+    """process_bulk_domain with the search and validation steps run in the shard pool"""
+    deadline = deadline or Deadline()
+    plan = bulk_domain_plan(clean_domain, validate, job_id, checkpoint, deadline)
+    try:
+        step, argument = next(plan)
+        while True:
+            if step == "search":
+                # The slot is held in this process while the pool does the work
+                with search_scheduler.slot(client, "bulk", deadline):
+                    outcome = pool.submit(
+                        shard_search, clean_domain, sources, deadline.wall_clock_expiry(), target
+                    ).result()
+            elif step == "validate":
+                with validation_scheduler.slot(client, "bulk", deadline):
+                    outcome = pool.submit(shard_validate, argument, deadline.wall_clock_expiry()).result()
+            else:
+                outcome = argument()
+            step, argument = plan.send(outcome)
+    except StopIteration as finished:
+        return finished.value
+
+def build_failed_domain_result(domain, error):
+    """Bulk result entry for a domain whose processing failed"""
+    empty_result = {"emails": [], "count": 0, "methods_used": [], "waterfall_steps": 0}
+    domain_result = build_bulk_domain_result(domain, empty_result)
+    domain_result["error"] = error
+    return domain_result
+
+@app.route('/api/find-emails-bulk-sharded', methods=['POST'])
+def find_emails_bulk_sharded():
+    """Bulk processing of large domain lists across a process pool"""
+    job_id = None
+    try:
+        data = request.get_json()
+        options, error = parse_bulk_request(
+            data, int(os.environ.get('SHARDED_MAX_DOMAINS', 1000)), "sharded bulk"
+        )
+        if error:
+            return jsonify({"error": error}), 400
+        
+        domains, clean_domains = options['domains'], options['clean_domains']
+        validate, sources = options['validate'], options['sources']
+        deadline, target = options['deadline'], options['target']
+        job_id, checkpoints = start_bulk_job(data, clean_domains, validate, sources, target)
+        
+        # Each domain once, skipping those already complete in the job store
+        pending = [domain for domain in dict.fromkeys(clean_domains)
+                   if checkpoints.get(domain, {}).get('status') != 'complete']
+        
+        failed = {}
+        processed = {}
+        if pending:
+            client = request_client_id()
+            # More threads than the client's bulk quota would only queue in the scheduler
+            threads = int(os.environ.get('SHARD_THREADS', search_scheduler.client_concurrency(client, "bulk")))
+            print(f"🧩 Sharding {len(pending)} domains across {shard_workers} processes, {threads} at a time")
+            with shard_pool_lease() as pool, ThreadPoolExecutor(max_workers=threads) as executor:
+                future_to_domain = {
+                    executor.submit(
+                        process_sharded_domain, pool, domain, sources, validate, job_id, checkpoints.get(domain),
+                        deadline, target, client
+                    ): domain
+                    for domain in pending
+                }
+                for future in as_completed(future_to_domain):
+                    domain = future_to_domain[future]
+                    try:
+                        processed[domain] = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        # Includes SchedulerBusy, retrying with the job_id picks the domain up again
+                        failed[domain] = str(e)[:200]
+        
+        # Merge in request order, domains complete before this run come from the job store
+        results = []
+        for domain in clean_domains:
+            checkpoint = checkpoints.get(domain)
+            if domain in processed:
+                results.append(processed[domain])
+            elif checkpoint and checkpoint['status'] == 'complete':
+                results.append(checkpoint['domain_result'])
+            else:
+                results.append(build_failed_domain_result(domain, failed.get(domain, "not processed")))
+        
+        job_store.finish_job(job_id, "partial" if failed or deadline.expired() else "complete")
+        
+        return jsonify(shape_bulk_response(build_bulk_response(
+            results, domains, validate, job_id, count_resumed(clean_domains, checkpoints), deadline
+        ), options['shape'])), 200
+        
+    except BrokenProcessPool as e:
+        reset_shard_pool()
+        return jsonify({
+            "success": False,
+            "error": f"Sharded processing error: {str(e)}",
+            "job_id": job_id
+        }), 500
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Sharded processing error: {str(e)}"
+        }), 500
+
+# Streaming bulk upload: the request body is a CSV or NDJSON domain list read
+# incrementally, deduplicated with SeenDomains and fed to a bounded worker pool
+# as it is read. Results are checkpointed in the job store and streamed back
+# as NDJSON, one line per domain plus a final summary line, so memory stays
+# flat whatever the file size.
+
+STREAM_CHUNK_SIZE = 64 * 1024
+DOMAIN_COLUMNS = ('domain', 'domains', 'website', 'url', 'company_domain', 'domain_name')
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit hashes (double hashing)"""
+    
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def add(self, value):
+        """Add a 64-bit hash, returns True if it was (probably) not present"""
+        h1, h2 = value & 0xFFFFFFFF, (value >> 32) | 1
+        added = False
+        for i in range(self.hash_count):
+            bit = (h1 + i * h2) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                added = True
+        return added
+
+class SeenDomains:
+    """Dedupe of 64-bit domain hashes that switches to a Bloom filter past `exact_limit`.
+    
+    Exact hashes live in a packed open-addressing table (8 bytes per slot, at
+    most half full), so 500k domains take about 8 MB. Past the switch a small
+    fraction of new domains (error_rate) may be reported as duplicates;
+    memory no longer grows with the list size.
+    """
+    
+    def __init__(self, exact_limit=500000, bloom_capacity=10000000, error_rate=0.001):
+        self.exact_limit = exact_limit
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self.table = array('Q', bytes(8 * 1024))
+        self.count = 0
+        self.bloom = None
+    
+    def _insert(self, value):
+        """Linear-probing insert, returns True if the value was not in the table"""
+        mask = len(self.table) - 1
+        slot = value & mask
+        while True:
+            current = self.table[slot]
+            if current == value:
+                return False
+            if not current:
+                self.table[slot] = value
+                self.count += 1
+                return True
+            slot = (slot + 1) & mask
+    
+    def _grow(self):
+        """Double the table and re-insert every hash"""
+        old_table = self.table
+        self.table = array('Q', bytes(16 * len(old_table)))
+        self.count = 0
+        for value in old_table:
+            if value:
+                self._insert(value)
+    
+    def add(self, domain):
+        """Record a domain, returns True the first time it is seen"""
+        # Zero marks an empty slot, so it is folded onto 1
+        value = int.from_bytes(hashlib.blake2b(domain.encode('utf-8'), digest_size=8).digest(), 'big') or 1
+        
+        if self.bloom is not None:
+            return self.bloom.add(value)
+        
+        if not self._insert(value):
+            return False
+        
+        if self.count > self.exact_limit:
+            print(f"🌸 Dedupe switching to a Bloom filter after {self.count} domains")
+            self.bloom = BloomFilter(self.bloom_capacity, self.error_rate)
+            for seen in self.table:
+                if seen:
+                    self.bloom.add(seen)
+            self.table = array('Q')
+        elif self.count * 2 > len(self.table):
+            self._grow()
+        return True
+
+def iter_stream_lines(stream, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield decoded lines from a binary stream without reading it whole"""
+    # utf-8-sig drops the BOM Excel and CRM exports put before the header
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+def iter_csv_domains(lines, column=None):
+    """Raw domain values from CSV lines, using a header column when present"""
+    index = 0
+    header_checked = False
+    for row in csv.reader(lines):
+        if not any(cell.strip() for cell in row):
+            continue
+        
+        # The header is the first non-empty row, exports often start with blank lines
+        if not header_checked:
+            header_checked = True
+            header = [cell.strip().lower() for cell in row]
+            wanted = [column.lower()] if column else DOMAIN_COLUMNS
+            matches = [header.index(name) for name in wanted if name in header]
+            if matches:
+                index = matches[0]
+                continue
+        
+        if index < len(row):
+            yield row[index]
+
+def iter_ndjson_domains(lines, field='domain'):
+    """Raw domain values from NDJSON lines: strings or objects with `field`"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = orjson.loads(line) if orjson is not None else json.loads(line)
+        except ValueError:
+            yield ''  # Counted as invalid
+            continue
+        
+        if isinstance(item, str):
+            yield item
+        elif isinstance(item, dict):
+            yield str(item.get(field, ''))
+        else:
+            yield ''
+
+def parse_bool(value, default=True):
+    """Boolean query parameter"""
+    if value is None:
+        return default
+    return str(value).strip().lower() not in ('0', 'false', 'no', 'off', '')
+
+@app.route('/api/find-emails-bulk-upload', methods=['POST'])
+def find_emails_bulk_upload():
+    """Bulk processing of a CSV/NDJSON domain list streamed in the request body"""
+    data = request.args.to_dict()
+    
+    content_type = (request.mimetype or '').lower()
+    upload_format = data.get('format') or ('ndjson' if 'ndjson' in content_type or 'jsonl' in content_type else 'csv')
+    if upload_format not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    
+    validate = parse_bool(data.get('validate'))
+    sources = data.get('sources', 'google,bing,yahoo')  # Limited for bulk
+    
+    # Query string flags arrive as strings
+    data['compact'] = parse_bool(data.get('compact'), False)
+    options, error = parse_pipeline_options(data)
+    if error:
+        return jsonify({"error": error}), 400
+    deadline, target, shape = options['deadline'], options['target'], options['shape']
+    client = request_client_id()
+    
+    # The domain list is not known up front, so the job id is given or random
+    job_id = data.get('job_id') or uuid.uuid4().hex[:16]
+    params = {"validate": validate, "sources": sources, **target}
+    job_store.start_job(job_id, [], params)
+    
+    # More workers than the client's bulk quota would only queue in the scheduler
+    workers = int(os.environ.get('STREAM_WORKERS', search_scheduler.client_concurrency(client, "bulk")))
+    seen = SeenDomains(
+        exact_limit=int(os.environ.get('STREAM_EXACT_DEDUPE_LIMIT', 500000)),
+        bloom_capacity=int(os.environ.get('STREAM_BLOOM_CAPACITY', 10000000))
+    )
+    
+    def generate():
+        counts = {"read": 0, "duplicates": 0, "invalid": 0, "processed": 0, "failed": 0, "resumed": 0,
+                  "emails_found": 0, "valid_emails": 0}
+        
+        lines = iter_stream_lines(request.stream)
+        if upload_format == 'ndjson':
+            raw_domains = iter_ndjson_domains(lines, data.get('field', 'domain'))
+        else:
+            raw_domains = iter_csv_domains(lines, data.get('column'))
+        
+        def emit(future_to_domain, future):
+            domain = future_to_domain.pop(future)
+            try:
+                domain_result = future.result()
+                counts["processed"] += 1
+            except Exception as e:
+                domain_result = build_failed_domain_result(domain, str(e)[:200])
+                counts["failed"] += 1
+            counts["emails_found"] += domain_result['total_found']
+            counts["valid_emails"] += domain_result.get('validation_summary', {}).get('total_valid', 0)
+            return dumps_json(shape_result(domain_result, **shape)) + b'\n'
+        
+        executor = ThreadPoolExecutor(max_workers=workers)
+        future_to_domain = {}
+        error = None
+        # Kept if the client disconnects mid-stream (GeneratorExit), finished domains stay resumable
+        status = "partial"
+        try:
+            try:
+                for raw_domain in raw_domains:
+                    counts["read"] += 1
+                    # Lowercase first so upper-case schemes and www. prefixes are stripped
+                    domain = normalize_domain(raw_domain.lower())
+                    if not domain or '.' not in domain or ' ' in domain:
+                        counts["invalid"] += 1
+                        continue
+                    if not seen.add(domain):
+                        counts["duplicates"] += 1
+                        continue
+                    
+                    checkpoint = job_store.get_checkpoint(job_id, domain)
+                    if checkpoint and checkpoint['status'] == 'complete':
+                        counts["resumed"] += 1
+                    
+                    future = executor.submit(
+                        process_bulk_domain, domain, sources, validate, job_id, checkpoint, deadline, target, client
+                    )
+                    future_to_domain[future] = domain
+                    
+                    # Bounded in-flight work: stop reading until a slot frees up
+                    while len(future_to_domain) >= workers * 2:
+                        done, _ = wait(list(future_to_domain), return_when=FIRST_COMPLETED)
+                        for finished in done:
+                            yield emit(future_to_domain, finished)
+            except Exception as e:
+                # Malformed upload (e.g. an unterminated CSV quote): stop reading,
+                # domains already in flight still finish and are reported
+                error = f"Upload read error after {counts['read']} rows: {str(e)[:200]}"
+                print(f"❌ {error}")
+            
+            for finished in as_completed(list(future_to_domain)):
+                yield emit(future_to_domain, finished)
+            
+            if error:
+                status = "failed"
+            else:
+                status = "partial" if counts["failed"] or deadline.expired() else "complete"
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            job_store.finish_job(job_id, status)
+        
+        summary = {
+            "job_id": job_id,
+            "status": status,
+            "total_rows_read": counts["read"],
+            "duplicates_skipped": counts["duplicates"],
+            "invalid_skipped": counts["invalid"],
+            "total_domains_processed": counts["processed"],
+            "failed_domains": counts["failed"],
+            "resumed_domains": counts["resumed"],
+            "total_emails_found": counts["emails_found"],
+            "total_valid_emails": counts["valid_emails"],
+            "validation_enabled": validate,
+            "dedupe": "bloom" if seen.bloom is not None else "exact",
+            "time_budget": deadline.budget,
+            "budget_exhausted": deadline.expired()
+        }
+        if error:
+            summary["error"] = error
+        yield dumps_json({"summary": summary}) + b'\n'
+    
+    response = app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Job-Id'] = job_id
+    return response
+
+# Async (ASGI) serving mode: the discovery endpoints await the async pipeline so
+# one process can hold many I/O-bound lookups in flight. Everything else is
+# served by the Flask app through the WSGI adapter.
+# Run with: gunicorn -c gunicorn.conf.py (SERVING_MODE=async) or uvicorn app:asgi_app
+
+async def find_emails_single_async(data, client="anonymous"):
+    """Async single domain comprehensive email discovery"""
+    try:
+        options, error = parse_single_request(data)
+        if error:
+            return {"error": error}, 400
+        
+        domain, validate, sources = options['domain'], options['validate'], options['sources']
+        deadline, target = options['deadline'], options['target']
+        
+        print(f"🎯 Starting async email discovery for: {domain}")
+        
+        async with search_scheduler.async_slot(client, "interactive", deadline):
+            result = await email_finder.async_waterfall_email_search(domain, sources, deadline=deadline, **target)
+        
+        validated = None
+        if validate and result['emails']:
+            print(f"🔍 Validating {len(result['emails'])} emails...")
+            async with validation_scheduler.async_slot(client, "interactive", deadline):
+                validated = await email_finder.async_waterfall_email_validation(result['emails'], deadline)
+        
+        print(f"✅ Completed: Found {result['count']} emails using {result['waterfall_steps']} methods")
+        return shape_result(
+            build_single_response(domain, sources, result, validated, deadline), **options['shape']
+        ), 200
+        
+    except SchedulerBusy as e:
+        return busy_payload(e), 429
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Processing error: {str(e)}",
+            "domain": data.get('domain', 'unknown') if isinstance(data, dict) else 'unknown'
+        }, 500
+
+async def find_emails_bulk_async(data, client="anonymous"):
+    """Async bulk domain processing, domains are searched concurrently"""
+    try:
+        options, error = parse_bulk_request(data)
+        if error:
+            return {"error": error}, 400
+        
+        domains, clean_domains = options['domains'], options['clean_domains']
+        validate, sources = options['validate'], options['sources']
+        deadline, target = options['deadline'], options['target']
+        
+        # SQLite calls are blocking, run them in the default executor
+        job_id, checkpoints = await asyncio.to_thread(start_bulk_job, data, clean_domains, validate, sources, target)
+        
+        # gather preserves input order; every domain finishes (and is checkpointed) before errors surface
+        results = await asyncio.gather(*(
+            async_process_bulk_domain(
+                domain, sources, validate, job_id, checkpoints.get(domain), deadline, target, client
+            )
+            for domain in clean_domains
+        ), return_exceptions=True)
+        busy = next((r for r in results if isinstance(r, SchedulerBusy)), None)
+        errors = [r for r in results if isinstance(r, BaseException) and not isinstance(r, SchedulerBusy)]
+        if errors:
+            raise errors[0]
+        if busy:
+            await asyncio.to_thread(job_store.finish_job, job_id, "partial")
+            return busy_payload(busy, job_id), 429
+        await asyncio.to_thread(job_store.finish_job, job_id, "partial" if deadline.expired() else "complete")
+        
+        return shape_bulk_response(build_bulk_response(
+            results, domains, validate, job_id, count_resumed(clean_domains, checkpoints), deadline
+        ), options['shape']), 200
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Bulk processing error: {str(e)}"
+        }, 500
+
+ASYNC_ROUTES = {
+    ('POST', '/api/find-emails'): find_emails_single_async,
+    ('POST', '/api/find-emails-bulk'): find_emails_bulk_async
+}
+
+wsgi_fallback = WsgiToAsgi(app)
+
+async def read_asgi_json(receive):
+    """Read the full ASGI request body and decode it as JSON"""
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    
+    try:
+        if not body:
+            return None
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError:
+        return None
+
+async def send_asgi_json(send, payload, status, accept_encoding=None):
+    """Send a JSON response over ASGI, compressed when the client accepts it"""
+    body = dumps_json(payload)
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'vary', b'Accept-Encoding')
+    ]
+    if status == 429 and 'retry_after' in payload:
+        headers.append((b'retry-after', str(payload['retry_after']).encode()))
+    
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_SIZE else None
+    if encoding:
+        # Large payloads: compress off the event loop
+        body = await asyncio.to_thread(compress_body, body, encoding)
+        headers.append((b'content-encoding', encoding.encode()))
+    
+    headers.append((b'content-length', str(len(body)).encode()))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def asgi_app(scope, receive, send):
+    """ASGI entry point: async discovery endpoints, Flask for the rest"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await email_finder.close_async_session()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    handler = None
+    if scope['type'] == 'http':
+        handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+    
+    if handler is None:
+        return await wsgi_fallback(scope, receive, send)
+    
+    headers = dict(scope.get('headers', []))
+    api_key = headers.get(b'x-api-key', b'').decode('latin-1')
+    remote_addr = forwarded_client_addr(
+        headers.get(b'x-forwarded-for', b'').decode('latin-1'),
+        scope['client'][0] if scope.get('client') else None
+    )
+    
+    data = await read_asgi_json(receive)
+    payload, status = await handler(data, client_id(api_key, remote_addr))
+    accept_encoding = headers.get(b'accept-encoding', b'').decode('latin-1')
+    await send_asgi_json(send, payload, status, accept_encoding)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,45 @@
+# Gunicorn configuration for the email discovery API
+#
+# SERVING_MODE selects how requests are served:
+#   sync  - Flask WSGI app (app:app) on threaded workers. Each in-flight
+#           discovery holds a worker thread, so concurrency is
+#           WEB_CONCURRENCY x GUNICORN_THREADS.
+#   async - ASGI app (app:asgi_app) on uvicorn workers. Discovery requests
+#           await the async pipeline, so one worker keeps many I/O-bound
+#           domain lookups in flight. Use about one worker per core.
+#
+# Environment variables:
+#   PORT             - bind port (default 5000)
+#   SERVING_MODE     - sync | async (default sync)
+#   WEB_CONCURRENCY  - worker processes (default 2 for sync, container cores for async)
+#   GUNICORN_THREADS - threads per sync worker (default 4)
+#   GUNICORN_TIMEOUT - worker timeout in seconds (default 300, a full waterfall can take minutes)
+#
+# preload_app loads app.py once in the master before forking, so imports and
+# the ComprehensiveEmailFinder instance are shared copy-on-write between workers.
+# The aiohttp session is created lazily inside each worker's event loop.
+#
+# Core and worker counts come from serving.py, which app.py also uses to size
+# its shard pool, so both agree on how many workers share the container.
+
+import os
+
+from serving import serving_mode, web_workers
+
+mode = serving_mode()
+workers = web_workers()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
+
+if mode == 'async':
+    wsgi_app = "app:asgi_app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "app:app"
+    worker_class = "gthread"
+    # Threads provide the concurrency, a couple of processes keep memory flat
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
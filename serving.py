@@ -0,0 +1,41 @@
+# Process sizing shared by gunicorn.conf.py and app.py
+#
+# Inside a container os.cpu_count() reports the host's cores, so the core
+# count is taken from the cgroup CPU quota when one is set. The web worker
+# count follows the gunicorn defaults in gunicorn.conf.py, so app.py can
+# divide the cores it has left between the workers that actually run.
+
+import math
+import os
+
+def container_cpus():
+    """CPUs available to this container: cgroup quota, then affinity, then cpu_count"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:  # cgroup v2
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:  # cgroup v1
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def serving_mode():
+    """SERVING_MODE: sync (Flask on gthread workers) or async (ASGI on uvicorn workers)"""
+    return os.environ.get('SERVING_MODE', 'sync')
+
+def web_workers():
+    """Gunicorn worker processes: WEB_CONCURRENCY, else 2 for sync and one per core for async"""
+    default = container_cpus() if serving_mode() == 'async' else 2
+    return max(1, int(os.environ.get('WEB_CONCURRENCY', default)))
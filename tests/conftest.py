@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# app.py opens its job store at import time, keep it out of the working tree
+os.environ.setdefault('JOB_STORE_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,139 @@
+import io
+import json
+
+import pytest
+
+import app
+from app import SeenDomains, iter_csv_domains, iter_ndjson_domains, iter_stream_lines
+
+
+class StubFinder:
+    def waterfall_email_search(self, domain, sources="all", limit=100, deadline=None, **target):
+        return {"domain": domain, "emails": [f"jane@{domain}"], "count": 1, "methods_used": ["stub"],
+                "waterfall_steps": 1, "budget_exhausted": False}
+    
+    def waterfall_email_validation(self, emails, deadline=None):
+        return [{"email": email, "valid": True} for email in emails]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = app.JobStore(path=str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(app, "job_store", store)
+    monkeypatch.setattr(app, "email_finder", StubFinder())
+    return store
+
+
+def csv_domains(text, column=None, chunk_size=7):
+    return list(iter_csv_domains(iter_stream_lines(io.BytesIO(text.encode('utf-8')), chunk_size), column))
+
+
+def upload(body, query="validate=false", content_type="text/csv"):
+    client = app.app.test_client()
+    response = client.post(f"/api/find-emails-bulk-upload?{query}", data=body, content_type=content_type)
+    lines = [json.loads(line) for line in response.data.splitlines()]
+    return response, lines[:-1], lines[-1]["summary"]
+
+
+def test_seen_domains_dedupes_and_grows():
+    seen = SeenDomains(exact_limit=10000)
+    
+    assert all(seen.add(f"domain{i}.com") for i in range(5000))
+    assert not any(seen.add(f"domain{i}.com") for i in range(5000))
+    assert seen.count == 5000
+    assert len(seen.table) >= 2 * seen.count
+    assert seen.bloom is None
+
+
+def test_seen_domains_switches_to_bloom_filter():
+    seen = SeenDomains(exact_limit=100, bloom_capacity=10000)
+    for i in range(150):
+        seen.add(f"domain{i}.com")
+    
+    assert seen.bloom is not None
+    assert len(seen.table) == 0
+    # Domains seen before the switch are still known
+    assert seen.add("domain0.com") is False
+    assert seen.add("domain149.com") is False
+    assert seen.add("brand-new.com") is True
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("a.com\nb.com\n", ["a.com", "b.com"]),
+    ("Domain,Name\na.com,A\nb.com,B", ["a.com", "b.com"]),
+    ("name,website\nA,a.com\nB,b.com\n", ["a.com", "b.com"]),
+    ("\ufeffdomain\r\na.com\r\n", ["a.com"]),
+    ("\n\n,\nname,domain\nA,a.com\n\nB,b.com\n", ["a.com", "b.com"]),
+    ("a.com,x\nb.com\n", ["a.com", "b.com"]),
+])
+def test_csv_domains(text, expected):
+    assert csv_domains(text) == expected
+
+
+def test_csv_column_parameter():
+    assert csv_domains("\nname,site\nA,a.com\n", column="Site") == ["a.com"]
+
+
+def test_ndjson_domains():
+    lines = ['"a.com"\n', '{"domain": "b.com"}\n', '\n', '{"site": "c.com"}\n', 'not json\n', '[1]\n']
+    
+    assert list(iter_ndjson_domains(lines)) == ["a.com", "b.com", "", "", ""]
+    assert list(iter_ndjson_domains(['{"site": "c.com"}'], field="site")) == ["c.com"]
+
+
+def test_upload_dedupes_and_checkpoints(store):
+    response, results, summary = upload("domain\nA.com\nhttps://WWW.a.com/\nb.com\nnot a domain\n")
+    
+    assert response.status_code == 200
+    assert sorted(result["domain"] for result in results) == ["a.com", "b.com"]
+    assert summary["duplicates_skipped"] == 1
+    assert summary["invalid_skipped"] == 1
+    assert summary["status"] == "complete"
+    assert store.get_job(summary["job_id"])["completed_domains"] == 2
+
+
+def test_upload_resumes_with_job_id(store):
+    _, _, first = upload("a.com\n")
+    _, _, second = upload("a.com\nb.com\n", f"validate=false&job_id={first['job_id']}")
+    
+    assert second["job_id"] == first["job_id"]
+    assert second["resumed_domains"] == 1
+
+
+def test_malformed_upload_reports_read_error(store):
+    body = "a.com\n" + "x" * 200000 + "\nb.com\n"
+    
+    response, results, summary = upload(body)
+    
+    assert response.status_code == 200
+    assert [result["domain"] for result in results] == ["a.com"]
+    assert summary["status"] == "failed"
+    assert "Upload read error" in summary["error"]
+    assert store.get_job(summary["job_id"])["status"] == "failed"
+
+
+def test_ndjson_upload(store):
+    body = '{"domain": "a.com"}\n"b.com"\n'
+    
+    _, results, summary = upload(body, content_type="application/x-ndjson")
+    
+    assert sorted(result["domain"] for result in results) == ["a.com", "b.com"]
+    assert summary["total_rows_read"] == 2
+
+
+def test_disconnect_marks_job_partial(store):
+    client = app.app.test_client()
+    response = client.post("/api/find-emails-bulk-upload?validate=false", data="a.com\nb.com\nc.com\n",
+                           content_type="text/csv", buffered=False)
+    job_id = response.headers["X-Job-Id"]
+    
+    next(iter(response.response))
+    response.close()
+    
+    assert store.get_job(job_id)["status"] == "partial"
+
+
+def test_bad_upload_options_are_rejected(store):
+    response = app.app.test_client().post("/api/find-emails-bulk-upload?format=xml", data="a.com")
+    
+    assert response.status_code == 400
@@ -0,0 +1,100 @@
+import gzip
+import json
+
+import pytest
+
+import app
+from app import negotiate_encoding, parse_pipeline_options, parse_response_shape, shape_result
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # Negotiation only checks that the module imported
+    monkeypatch.setattr(app, "brotli", object())
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(app, "brotli", None)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("gzip;q=0.5;x=1", "gzip"),
+    ("gzip;x=1;q=0.5, br;x=1;q=0.4", "gzip"),
+    ("GZIP ; Q=0.8", "gzip"),
+    ("gzip;q=0, br;q=0", None),
+    ("*", "br"),
+    ("*;q=0.2, gzip;q=0", "br"),
+    ("gzip;q=nonsense", None),
+])
+def test_negotiate_encoding(with_brotli, header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_br_is_skipped_without_brotli(without_brotli):
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("br, gzip;q=0.1") == "gzip"
+
+
+def test_large_json_responses_are_gzipped(without_brotli, monkeypatch, tmp_path):
+    store = app.JobStore(path=str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(app, "job_store", store)
+    store.start_job("job1", ["a.com"], {"padding": "x" * 4096})
+    client = app.app.test_client()
+    
+    compressed = client.get("/api/jobs/job1", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/api/jobs/job1")
+    
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+    assert "Content-Encoding" not in plain.headers
+
+
+@pytest.mark.parametrize("fields, expected", [
+    (None, None),
+    ([], None),
+    (["emails_found", "total_found"], {"emails_found", "total_found"}),
+    ("emails_found, total_found,", {"emails_found", "total_found"}),
+])
+def test_parse_response_shape(fields, expected):
+    assert parse_response_shape({"fields": fields}) == {"fields": expected, "compact": False}
+
+
+@pytest.mark.parametrize("fields", [5, ["a", {}], {"emails_found": True}, True])
+def test_bad_fields_are_rejected(fields):
+    options, error = parse_pipeline_options({"fields": fields})
+    
+    assert options is None
+    assert error.startswith("fields must be")
+
+
+def test_bad_fields_return_400_before_any_work(monkeypatch):
+    monkeypatch.setattr(app, "email_finder", None)
+    client = app.app.test_client()
+    
+    response = client.post("/api/find-emails", json={"domain": "example.com", "fields": ["a", {}]})
+    
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("fields must be")
+
+
+def test_shape_result_keeps_identity_and_drops_raw_details():
+    entry = {
+        "success": True,
+        "domain": "example.com",
+        "emails_found": ["jane@example.com"],
+        "total_found": 1,
+        "validated_emails": [{"email": "jane@example.com", "valid": True, "raw_response": {}, "validation_details": {}}]
+    }
+    
+    assert shape_result(entry, fields={"total_found"}) == {"success": True, "domain": "example.com", "total_found": 1}
+    assert shape_result(entry, compact=True)["validated_emails"] == [{"email": "jane@example.com", "valid": True}]
+    # The original entry is not modified
+    assert "raw_response" in entry["validated_emails"][0]
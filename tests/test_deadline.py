@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+import app
+from app import Deadline, parse_time_budget
+
+
+def test_unbounded_deadline_keeps_the_usual_timeouts():
+    deadline = Deadline()
+    
+    assert deadline.remaining() is None
+    assert deadline.expired() is False
+    assert deadline.timeout(60) == 60
+    assert deadline.wall_clock_expiry() is None
+
+
+def test_timeout_is_shortened_to_the_remaining_budget():
+    deadline = Deadline(2)
+    
+    assert 0 < deadline.remaining() <= 2
+    assert deadline.timeout(60) <= 2
+    assert deadline.timeout(1) == 1
+
+
+def test_zero_budget_is_already_expired():
+    deadline = Deadline(0)
+    
+    assert deadline.expired() is True
+    assert deadline.remaining() == 0.0
+    # Calls still get a minimal timeout instead of zero
+    assert deadline.timeout(60) == 0.1
+
+
+def test_deadline_expires(monkeypatch):
+    deadline = Deadline(5)
+    now = time.monotonic()
+    monkeypatch.setattr(app.time, "monotonic", lambda: now + 10)
+    
+    assert deadline.expired() is True
+    assert deadline.remaining() == 0.0
+
+
+def test_until_rebuilds_a_deadline_in_another_process():
+    deadline = Deadline(30)
+    rebuilt = Deadline.until(deadline.wall_clock_expiry())
+    
+    assert rebuilt.remaining() == pytest.approx(deadline.remaining(), abs=0.5)
+    assert Deadline.until(None).remaining() is None
+
+
+@pytest.mark.parametrize("data, remaining", [
+    ({}, None),
+    ({"time_budget": 10}, 10),
+    ({"time_budget": "2.5"}, 2.5),
+])
+def test_parse_time_budget(data, remaining):
+    deadline = parse_time_budget(data)
+    
+    if remaining is None:
+        assert deadline.remaining() is None
+    else:
+        assert deadline.remaining() == pytest.approx(remaining, abs=0.5)
+
+
+@pytest.mark.parametrize("budget", [0, -1, "soon", [5]])
+def test_parse_time_budget_rejects_bad_values(budget):
+    assert parse_time_budget({"time_budget": budget}) is None
+
+
+def test_expired_budget_skips_network_stages():
+    plan = app.email_finder.waterfall_plan("example.com", Deadline(0))
+    
+    with pytest.raises(StopIteration) as finished:
+        next(plan)
+    result = finished.value.value
+    
+    assert result["budget_exhausted"] is True
+    assert result["stages_skipped"] == [stage["method"] for stage in app.email_finder.discovery_stages]
+    assert "smart_patterns" in result["methods_used"]
+
+
+def test_stages_run_while_budget_remains():
+    plan = app.email_finder.waterfall_plan("example.com", Deadline(60))
+    
+    stages = [next(plan)]
+    with pytest.raises(StopIteration) as finished:
+        while True:
+            stages.append(plan.send({"emails": ["jane@example.com"], "method": stages[-1]["method"]}))
+    result = finished.value.value
+    
+    assert [stage["method"] for stage in stages] == [stage["method"] for stage in app.email_finder.discovery_stages]
+    assert result["budget_exhausted"] is False
+    assert result["stages_skipped"] == []
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import Deadline, DeliverabilityEngine
+
+
+class StaticResolver:
+    """dnspython-style resolver answering from a {(domain, rdtype): [values]} dict"""
+    
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+    
+    def resolve(self, qname, rdtype, lifetime=None):
+        self.queries.append((qname, rdtype))
+        values = self.records.get((qname, rdtype))
+        if not values:
+            raise LookupError(f"No {rdtype} records for {qname}")
+        if rdtype == 'MX':
+            return [SimpleNamespace(exchange=value) for value in values]
+        return list(values)
+
+
+@pytest.fixture
+def resolver():
+    return StaticResolver({
+        ("example.com", "MX"): ["mx1.example.com.", "mx2.example.com."],
+        ("a-only.example", "A"): ["192.0.2.1"],
+        ("null-mx.example", "MX"): ["."]
+    })
+
+
+@pytest.fixture
+def engine(resolver):
+    return DeliverabilityEngine(resolver=resolver)
+
+
+@pytest.mark.parametrize("email, valid, deliverable, needs_verification", [
+    ("jane.doe@example.com", True, True, True),
+    ("info@example.com", True, "unknown", False),
+    ("jane@a-only.example", True, True, True),
+    ("jane@null-mx.example", False, False, False),
+    ("jane@missing.example", False, False, False),
+    ("jane@mailinator.com", False, False, False),
+    ("not-an-email@example", False, False, False),
+])
+def test_assess_local_checks(engine, email, valid, deliverable, needs_verification):
+    result = engine.assess([email])[email]
+    
+    assert result["valid"] == valid
+    assert result["deliverable"] == deliverable
+    assert result["validation_details"]["needs_verification"] is needs_verification
+
+
+def test_role_account_is_valid_but_unverified(engine):
+    result = engine.assess(["sales@example.com"])["sales@example.com"]
+    
+    assert result["valid"] is True
+    assert result["deliverable"] == "unknown"
+    assert result["role_account"] is True
+
+
+def test_one_lookup_per_domain_and_cached(engine, resolver):
+    engine.assess(["jane.doe@example.com", "john.smith@example.com", "info@example.com"])
+    engine.assess(["jane.doe@example.com"])
+    
+    assert resolver.queries.count(("example.com", "MX")) == 1
+
+
+def test_disposable_domain_is_not_looked_up(engine, resolver):
+    engine.assess(["jane@mailinator.com"])
+    
+    assert resolver.queries == []
+
+
+def test_cache_is_bounded(resolver):
+    engine = DeliverabilityEngine(resolver=resolver, cache_size=2)
+    engine.assess([f"jane@domain{i}.example" for i in range(5)])
+    
+    assert list(engine._domain_cache) == ["domain3.example", "domain4.example"]
+
+
+def test_catch_all_domain_leaves_pending_list(engine):
+    results = engine.assess(["jane.doe@example.com", "jane@a-only.example"])
+    engine.mark_catch_all(results, "example.com", True)
+    
+    assert engine.pending_domains(results) == ["a-only.example"]
+    assert results["jane.doe@example.com"]["deliverable"] == "unknown"
+
+
+def test_catch_all_needs_explicit_deliverable(engine):
+    assert engine.catch_all_from_probe({"valid": True, "raw_response": {"valid": True}}) is None
+    assert engine.catch_all_from_probe({"raw_response": {"deliverable": True}}) is True
+    assert engine.catch_all_from_probe({"raw_response": {"deliverable": False}}) is False
+
+
+def test_expired_budget_skips_dns(engine, resolver):
+    results = engine.assess(["jane@other.example"], Deadline(0))
+    
+    assert resolver.queries == []
+    assert results["jane@other.example"]["valid"] == "unknown"
+    assert results["jane@other.example"]["validation_details"]["needs_verification"] is False
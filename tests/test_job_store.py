@@ -0,0 +1,163 @@
+import time
+
+import pytest
+
+import app
+from app import Deadline, JobStore, bulk_domain_plan, process_bulk_domain
+
+
+def search_result(domain, emails=("jane@example.com",), budget_exhausted=False):
+    return {
+        "domain": domain,
+        "emails": list(emails),
+        "count": len(emails),
+        "methods_used": ["stub"],
+        "waterfall_steps": [],
+        "budget_exhausted": budget_exhausted
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = JobStore(path=str(tmp_path / "jobs.db"), ttl=3600)
+    monkeypatch.setattr(app, "job_store", store)
+    return store
+
+
+class StubFinder:
+    """Counts pipeline calls so resumed work can be told apart from fresh work"""
+    
+    def __init__(self):
+        self.searches = []
+        self.validations = []
+    
+    def waterfall_email_search(self, domain, sources="all", limit=100, deadline=None, **target):
+        self.searches.append(domain)
+        return search_result(domain)
+    
+    def waterfall_email_validation(self, emails, deadline=None):
+        self.validations.append(list(emails))
+        return [{"email": email, "valid": True} for email in emails]
+
+
+@pytest.fixture
+def finder(monkeypatch):
+    finder = StubFinder()
+    monkeypatch.setattr(app, "email_finder", finder)
+    return finder
+
+
+def test_checkpoints_resume_a_job(store):
+    store.start_job("job1", ["a.com", "b.com"], {"validate": True})
+    store.save_search_result("job1", "a.com", search_result("a.com"))
+    store.save_domain_result("job1", "b.com", search_result("b.com"), {"domain": "b.com"})
+    
+    checkpoints = store.load_checkpoints("job1")
+    
+    assert checkpoints["a.com"]["status"] == "searched"
+    assert checkpoints["a.com"]["domain_result"] is None
+    assert checkpoints["b.com"]["status"] == "complete"
+    assert store.get_checkpoint("job1", "b.com") == checkpoints["b.com"]
+    assert store.get_checkpoint("job1", "c.com") is None
+
+
+def test_get_job_reports_progress(store):
+    store.start_job("job1", ["a.com", "b.com"], {"validate": False})
+    store.save_domain_result("job1", "a.com", search_result("a.com"), {"domain": "a.com"})
+    store.finish_job("job1", "partial")
+    
+    job = store.get_job("job1")
+    
+    assert job["status"] == "partial"
+    assert job["completed_domains"] == 1
+    assert job["total_domains"] == 2
+    assert job["results"] == [{"domain": "a.com"}]
+    assert store.get_job("missing") is None
+
+
+def test_streamed_job_lists_checkpointed_domains(store):
+    store.start_job("job1", [], {})
+    store.save_domain_result("job1", "a.com", search_result("a.com"), {"domain": "a.com"})
+    
+    assert store.get_job("job1")["domains"] == ["a.com"]
+
+
+def test_reused_job_id_keeps_latest_domain_list(store):
+    store.start_job("job1", ["a.com"], {"validate": False})
+    store.start_job("job1", ["a.com", "b.com"], {"validate": True})
+    
+    job = store.get_job("job1")
+    
+    assert job["domains"] == ["a.com", "b.com"]
+    assert job["params"] == {"validate": True}
+    assert job["status"] == "running"
+
+
+def test_expired_jobs_are_purged(store):
+    store.start_job("old", ["a.com"], {})
+    store.save_search_result("old", "a.com", search_result("a.com"))
+    with store.connect() as db:
+        db.execute("UPDATE jobs SET created_at = ? WHERE job_id = 'old'", (time.time() - 7200,))
+    
+    store.start_job("new", ["b.com"], {})
+    
+    assert store.get_job("old") is None
+    assert store.load_checkpoints("old") == {}
+    assert store.get_job("new") is not None
+
+
+def test_bulk_jobs_are_fresh_unless_job_id_is_sent(store):
+    first, _ = app.start_bulk_job({}, ["a.com"], False, "google")
+    second, _ = app.start_bulk_job({}, ["a.com"], False, "google")
+    resumed, _ = app.start_bulk_job({"job_id": first}, ["a.com"], False, "google")
+    
+    assert first != second
+    assert resumed == first
+
+
+def test_process_bulk_domain_checkpoints_and_resumes(store, finder):
+    store.start_job("job1", ["a.com"], {})
+    
+    first = process_bulk_domain("a.com", "google", True, "job1", None, Deadline(60))
+    checkpoint = store.get_checkpoint("job1", "a.com")
+    again = process_bulk_domain("a.com", "google", True, "job1", checkpoint, Deadline(60))
+    
+    assert checkpoint["status"] == "complete"
+    assert again == first
+    assert first["validation_summary"] == {"total_validated": 1, "total_valid": 1}
+    assert finder.searches == ["a.com"]
+    assert len(finder.validations) == 1
+
+
+def test_process_bulk_domain_reuses_search_checkpoint(store, finder):
+    store.start_job("job1", ["a.com"], {})
+    store.save_search_result("job1", "a.com", search_result("a.com", ["x@a.com", "y@a.com"]))
+    
+    result = process_bulk_domain("a.com", "google", True, "job1", store.get_checkpoint("job1", "a.com"),
+                                 Deadline(60))
+    
+    assert finder.searches == []
+    assert finder.validations == [["x@a.com", "y@a.com"]]
+    assert result["emails_found"] == ["x@a.com", "y@a.com"]
+
+
+def test_budget_exhausted_search_is_not_checkpointed():
+    plan = bulk_domain_plan("a.com", False, "job1", None, Deadline(60))
+    
+    assert next(plan) == ("search", None)
+    with pytest.raises(StopIteration) as finished:
+        step, _ = plan.send(search_result("a.com", budget_exhausted=True))
+        # Only the final domain result is stored
+        assert step == "store"
+        plan.send(None)
+    assert finished.value.value["domain"] == "a.com"
+
+
+def test_expired_deadline_stores_nothing():
+    deadline = Deadline(0)
+    plan = bulk_domain_plan("a.com", False, "job1", None, deadline)
+    
+    next(plan)
+    with pytest.raises(StopIteration) as finished:
+        plan.send(search_result("a.com", budget_exhausted=True))
+    assert finished.value.value["budget_exhausted"] is True
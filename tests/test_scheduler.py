@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+
+import app
+from app import Deadline, FairShareScheduler, SchedulerBusy
+
+
+def hold(scheduler, client, priority="interactive"):
+    """Take a slot and keep it until the returned release() is called"""
+    entered = threading.Event()
+    done = threading.Event()
+    
+    def run():
+        with scheduler.slot(client, priority):
+            entered.set()
+            done.wait(5)
+    
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert entered.wait(5)
+    
+    def release():
+        done.set()
+        thread.join(5)
+    return release
+
+
+def queue(scheduler, client, priority, order):
+    """Wait for a slot in a thread, recording the client once granted"""
+    def run():
+        with scheduler.slot(client, priority):
+            order.append((client, priority))
+    
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def wait_queued(scheduler, count):
+    for _ in range(500):
+        if len(scheduler._waiters) == count:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"expected {count} waiters, got {len(scheduler._waiters)}")
+
+
+def test_interactive_overtakes_queued_bulk():
+    scheduler = FairShareScheduler("test", capacity=1, default_concurrency=4, interactive_reserve=0)
+    release = hold(scheduler, "a", "bulk")
+    order = []
+    threads = [queue(scheduler, "b", "bulk", order)]
+    wait_queued(scheduler, 1)
+    threads.append(queue(scheduler, "c", "interactive", order))
+    wait_queued(scheduler, 2)
+    
+    release()
+    for thread in threads:
+        thread.join(5)
+    
+    assert order == [("c", "interactive"), ("b", "bulk")]
+
+
+def test_quota_applies_per_client_and_priority():
+    scheduler = FairShareScheduler("test", capacity=8, default_concurrency=1)
+    release_bulk = hold(scheduler, "a", "bulk")
+    
+    # Same client, other priority class: not held up by its own bulk run
+    with scheduler.slot("a", "interactive", Deadline(1)) as granted:
+        assert granted is True
+    # Same flow over quota: waits until the deadline and gets no slot
+    with scheduler.slot("a", "bulk", Deadline(0.1)) as granted:
+        assert granted is False
+    
+    release_bulk()
+    assert scheduler.metrics()["clients"]["a"]["priorities"]["bulk"]["timeouts"] == 1
+
+
+def test_bulk_cannot_take_the_interactive_reserve():
+    scheduler = FairShareScheduler("test", capacity=2, default_concurrency=4, interactive_reserve=1)
+    release = hold(scheduler, "a", "bulk")
+    
+    with scheduler.slot("b", "bulk", Deadline(0.1)) as granted:
+        assert granted is False
+    with scheduler.slot("b", "interactive", Deadline(0.1)) as granted:
+        assert granted is True
+    release()
+
+
+def test_full_queue_is_rejected():
+    scheduler = FairShareScheduler("test", capacity=8, default_concurrency=1, queue_factor=1)
+    release = hold(scheduler, "a")
+    order = []
+    thread = queue(scheduler, "a", "interactive", order)
+    wait_queued(scheduler, 1)
+    
+    with pytest.raises(SchedulerBusy):
+        with scheduler.slot("a", "interactive"):
+            pass
+    
+    release()
+    thread.join(5)
+    assert order == [("a", "interactive")]
+    assert scheduler.metrics()["clients"]["a"]["priorities"]["interactive"]["rejected"] == 1
+
+
+def test_max_wait_raises_busy_but_deadline_does_not():
+    scheduler = FairShareScheduler("test", capacity=1, default_concurrency=1, max_wait=0.1)
+    release = hold(scheduler, "a")
+    
+    with pytest.raises(SchedulerBusy) as busy:
+        with scheduler.slot("b", "interactive", Deadline(5)):
+            pass
+    assert busy.value.retry_after == 1
+    
+    # A deadline shorter than max_wait ends the wait without an error
+    with scheduler.slot("b", "interactive", Deadline(0.05)) as granted:
+        assert granted is False
+    
+    release()
+    assert scheduler._waiters == []
+
+
+def test_async_slot_respects_quota_and_max_wait():
+    scheduler = FairShareScheduler("test", capacity=1, default_concurrency=1, max_wait=0.1)
+    
+    async def run():
+        async with scheduler.async_slot("a") as granted:
+            assert granted is True
+            with pytest.raises(SchedulerBusy):
+                async with scheduler.async_slot("b", "interactive", Deadline(5)):
+                    pass
+        async with scheduler.async_slot("b") as granted:
+            return granted
+    
+    assert asyncio.run(run()) is True
+    assert scheduler.metrics()["active"] == 0
+
+
+def test_busy_scheduler_answers_429(monkeypatch):
+    scheduler = FairShareScheduler("search", capacity=1, default_concurrency=1, max_wait=0.05)
+    monkeypatch.setattr(app, "search_scheduler", scheduler)
+    client = app.app.test_client()
+    release = hold(scheduler, app.client_id(None, "127.0.0.1"))
+    
+    response = client.post("/api/find-emails", json={"domain": "example.com"})
+    release()
+    
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["retry_after"] == 1
+
+
+class StubFinder:
+    def waterfall_email_search(self, domain, sources="all", limit=100, deadline=None, **target):
+        return {"domain": domain, "emails": [f"jane@{domain}"], "count": 1, "methods_used": ["stub"],
+                "waterfall_steps": 1, "budget_exhausted": False}
+    
+    def waterfall_email_validation(self, emails, deadline=None):
+        return [{"email": email, "valid": True} for email in emails]
+
+
+def test_sharded_work_goes_through_the_parent_scheduler(monkeypatch, tmp_path):
+    scheduler = FairShareScheduler("search", capacity=4, default_concurrency=2)
+    monkeypatch.setattr(app, "search_scheduler", scheduler)
+    monkeypatch.setattr(app, "email_finder", StubFinder())
+    monkeypatch.setattr(app, "job_store", app.JobStore(path=str(tmp_path / "jobs.db")))
+    
+    @contextmanager
+    def thread_pool_lease():
+        # Stand-in for the process pool, the stub finder does not cross processes
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            yield pool
+    monkeypatch.setattr(app, "shard_pool_lease", thread_pool_lease)
+    
+    domains = ["a.com", "b.com", "c.com", "a.com"]
+    response = app.app.test_client().post("/api/find-emails-bulk-sharded", json={"domains": domains})
+    body = response.get_json()
+    
+    assert response.status_code == 200
+    assert [result["domain"] for result in body["results"]] == domains
+    bulk = scheduler.metrics()["clients"][app.client_id(None, "127.0.0.1")]["priorities"]["bulk"]
+    assert bulk["granted"] == 3